@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Micro-Benchmark: SSE-Parsing eines aufgezeichneten Streams.
+
+Vergleicht den alten Pfad (Zeilen + voller JSON-Decode je Frame) mit
+controller.sse.ChatStreamDecoder auf rohen Byte-Chunks.
+
+    python benchmarks/bench_sse.py --tokens 4000 --repeat 20
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.sse import ChatStreamDecoder
+
+WORDS = (
+    "Das Samsung Galaxy S25 nutzt den Snapdragon 8 Elite mit Adreno 830 GPU "
+    "und One UI 7 auf Android 15 für flüssige 120Hz Darstellung"
+).split()
+
+
+def make_recorded_stream(tokens=4000, seed=25):
+    """
+    Erzeugt einen OpenRouter-typischen Stream (Rollen-Frame, Keep-Alives,
+    Delta-Frames, finish_reason + usage, [DONE]) in netzwerkartigen Chunks.
+    """
+    rnd = random.Random(seed)
+    head = {
+        "id": "gen-1729000000-aidroid",
+        "provider": "OpenAI",
+        "model": "openai/gpt-4o-mini",
+        "object": "chat.completion.chunk",
+        "created": 1729000000,
+    }
+    frames = [b": OPENROUTER PROCESSING\n\n"]
+
+    def frame(delta, finish=None, usage=None):
+        chunk = dict(head)
+        chunk["choices"] = [
+            {
+                "index": 0,
+                "delta": delta,
+                "finish_reason": finish,
+                "native_finish_reason": finish,
+                "logprobs": None,
+            }
+        ]
+        if usage:
+            chunk["usage"] = usage
+        data = json.dumps(chunk, ensure_ascii=False, separators=(",", ":"))
+        return f"data: {data}\n\n".encode("utf-8")
+
+    frames.append(frame({"role": "assistant", "content": ""}))
+    for i in range(tokens):
+        word = rnd.choice(WORDS)
+        if i % 97 == 0:
+            word = f'"{word}"\n'
+        frames.append(frame({"role": "assistant", "content": " " + word}))
+        if i % 500 == 499:
+            frames.append(b": OPENROUTER PROCESSING\n\n")
+    frames.append(
+        frame(
+            {"role": "assistant", "content": ""},
+            finish="stop",
+            usage={
+                "prompt_tokens": 42,
+                "completion_tokens": tokens,
+                "total_tokens": tokens + 42,
+            },
+        )
+    )
+    frames.append(b"data: [DONE]\n\n")
+
+    raw = b"".join(frames)
+    chunks = []
+    pos = 0
+    while pos < len(raw):
+        size = rnd.randint(64, 4096)
+        chunks.append(raw[pos : pos + size])
+        pos += size
+    return chunks
+
+
+def legacy_parse(chunks):
+    """Alter Pfad: Zeilen splitten, jeden data-Frame vollständig decodieren."""
+    text = b"".join(chunks).decode("utf-8")
+    tokens = []
+    for line in text.splitlines():
+        if line.startswith("data: "):
+            chunk = line.removeprefix("data: ")
+            if chunk == "[DONE]":
+                break
+            try:
+                token = json.loads(chunk)["choices"][0]["delta"].get("content", "")
+                if token:
+                    tokens.append(token)
+            except Exception:
+                continue
+    return tokens
+
+
+def decoder_parse(chunks):
+    decoder = ChatStreamDecoder()
+    tokens = []
+    for chunk in chunks:
+        tokens.extend(decoder.feed(chunk))
+    tokens.extend(decoder.flush())
+    return tokens
+
+
+def bench(fn, chunks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    chunks = make_recorded_stream(args.tokens)
+    assert legacy_parse(chunks) == decoder_parse(chunks)
+
+    size_kb = sum(len(c) for c in chunks) / 1024
+    print(f"Stream: {args.tokens} Tokens, {len(chunks)} Chunks, {size_kb:.0f} KB")
+    results = {}
+    for name, fn in (("legacy", legacy_parse), ("decoder", decoder_parse)):
+        best = bench(fn, chunks, args.repeat)
+        results[name] = best
+        print(f"{name:>8}: {best * 1000:7.2f} ms  ({args.tokens / best:,.0f} Tokens/s)")
+    print(f" Speedup: {results['legacy'] / results['decoder']:.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Lokaler Fake-OpenRouter-Server für Benchmarks (nur stdlib).
+
+    GET  /models            -> Modellliste
+    POST /chat/completions  -> aufgezeichneter SSE-Stream (bench_sse)
+
+`latency` verzögert jede Antwort vor dem ersten Byte, `chunk_delay` jeden
+Chunk, um Netzwerk zu simulieren.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_sse import make_recorded_stream
+
+MODELS = [
+    {
+        "id": f"provider{i % 7}/model-{i}",
+        "name": f"Model {i}",
+        "context_length": 8192 * (1 + i % 16),
+        "pricing": {"prompt": f"{i / 1e7:.7f}", "completion": f"{i / 5e6:.7f}"},
+    }
+    for i in range(300)
+]
+
+
+class FakeOpenRouter:
+    """Startet den Server in einem Daemon-Thread; `url` ist die Basis-URL."""
+
+    def __init__(self, tokens=500, latency=0.0, chunk_delay=0.0):
+        self.chunks = make_recorded_stream(tokens)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _begin(self):
+                fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+            def do_GET(self):
+                self._begin()
+                body = json.dumps({"data": MODELS}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", '"models-v1"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self._begin()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in fake.chunks:
+                    if fake.chunk_delay:
+                        time.sleep(fake.chunk_delay)
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    with FakeOpenRouter() as fake:
+        print(f"Fake OpenRouter auf {fake.url} (Strg+C beendet)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
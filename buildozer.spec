@@ -20,7 +20,7 @@ icon.filename = %(source.dir)s/assets/icon.png
 presplash.filename = %(source.dir)s/assets/presplash.png
 
 # Anforderungen (je nach App!)
-requirements = python3,kivy,requests,sqlite3
+requirements = python3,kivy,requests,sqlite3,openssl,cryptography
 
 # Zusätzliche zu includende Dateien/Ordner (Optional)
 # source.include_exts = py,png,jpg,kv,atlas,json,ttf,otf,xml,md
@@ -1,52 +1,552 @@
-from kivy.uix.scrollview import ScrollView
-from kivy.uix.boxlayout import BoxLayout
+import asyncio
+from itertools import count
+
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.uix.label import Label
-from kivy.metrics import dp
-from kivy.properties import StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.factory import Factory
+from kivy.core.text import Label as CoreLabel
+from kivy.metrics import dp, sp
+from kivy.properties import StringProperty, ObjectProperty, ListProperty
 from kivy.clock import Clock
 
-class ChatBubble(Label):
-    """Einzelne Sprechblase mit Stil je nach Rolle."""
-    def __init__(self, role, text, **kwargs):
+from controller import metrics
+
+BUBBLE_PADDING = (dp(12), dp(8))
+BUBBLE_MARGIN = dp(16)
+FONT_SIZE = "16sp"
+# Streaming: längere Antworten werden in Zeilen dieser Größe (Zeichen)
+# aufgeteilt, damit ein Flush nur das Ende neu misst
+STREAM_CHUNK_CHARS = 600
+CHUNK_SEPARATORS = ("\n\n", "\n", " ")
+# Nach einer Breitenänderung: so viele Zeilen außerhalb der Ansicht je Frame
+REMEASURE_BATCH = 40
+
+
+def measure_height(text, width):
+    """Höhe einer Sprechblase für `text` bei gegebener Breite (ohne Widget)."""
+    text_width = max(width * 0.9 - 2 * BUBBLE_PADDING[0], dp(40))
+    label = CoreLabel(
+        text=text or " ", font_size=sp(16), markup=True, text_size=(text_width, None)
+    )
+    # Nur Layout, keine Textur: gezeichnet wird erst im ChatBubble
+    return label.render()[1] + 2 * BUBBLE_PADDING[1] + BUBBLE_MARGIN
+
+
+def split_stream_text(text, limit=STREAM_CHUNK_CHARS):
+    """
+    Teilt gestreamten Text in fertige Abschnitte und den offenen Rest.
+    Getrennt wird bevorzugt am Absatz, sonst am Zeilenende oder Leerzeichen
+    (der Trenner entfällt); nur ohne Trenner wird hart bei `limit` geschnitten.
+    """
+    chunks = []
+    while len(text) > limit:
+        for separator in CHUNK_SEPARATORS:
+            cut = text.rfind(separator, 1, limit + 1)
+            if cut > 0:
+                chunks.append(text[:cut])
+                text = text[cut + len(separator) :]
+                break
+        else:
+            chunks.append(text[:limit])
+            text = text[limit:]
+    return chunks, text
+
+
+class ChatBubble(RecycleDataViewBehavior, Label):
+    """Einzelne Sprechblase mit Stil je nach Rolle (wird von ChatArea recycelt)."""
+
+    role = StringProperty("ai")
+
+    def __init__(self, role="ai", text="", **kwargs):
         super().__init__(**kwargs)
         self.text = text
         self.size_hint_y = None
-        self.padding = [dp(12), dp(8)]
-        self.font_size = '16sp'
+        self.padding = list(BUBBLE_PADDING)
+        self.font_size = FONT_SIZE
         self.markup = True
-        self.color = (.95, .95, .95, 1)
-        self.text_size = (self.width, None)
-        self.halign = 'right' if role == 'user' else 'left'
-        self.valign = 'middle'
+        self.color = (0.95, 0.95, 0.95, 1)
+        self.valign = "middle"
         self.role = role
-        Clock.schedule_once(lambda _: self._resize(), 0)
+        self.bind(width=self._update_text_size)
 
-    def _resize(self, *args):
-        self.texture_update()
-        self.height = self.texture_size[1] + dp(16)
+    def on_role(self, instance, role):
+        self.halign = "right" if role == "user" else "left"
+
+    def _update_text_size(self, *args):
         self.text_size = (self.width * 0.9, None)
 
-    def append_token(self, token):
-        self.text += token
-        self._resize()
+
+def column_label(column):
+    """Markup einer Spalte im Modellvergleich: Modell, Antwort, Statistik."""
+    text = f"[b]{column['model']}[/b]\n{column['text']}"
+    if column.get("stats"):
+        text += f"\n[size=12sp][color=aaaaaa]{column['stats']}[/color][/size]"
+    return text
+
+
+def format_stats(report):
+    """Kurzstatistik aus FanOut.report() für eine Spalte."""
+    if report["status"] == "failed":
+        return "Fehler"
+    if report["status"] == "cancelled":
+        return "abgebrochen"
+    parts = []
+    if report["ttft"] is not None:
+        parts.append(f"erstes Token {report['ttft']:.2f}s")
+    if report["latency"] is not None:
+        parts.append(f"gesamt {report['latency']:.1f}s")
+    if report["tokens_per_second"]:
+        parts.append(f"{report['tokens_per_second']:.0f} tok/s")
+    return " · ".join(parts)
 
 
-class ChatArea(ScrollView):
-    """Container für alle Sprechblasen + Autoscroll."""
+class ParallelRow(RecycleDataViewBehavior, BoxLayout):
+    """Zeile mit den Antworten mehrerer Modelle nebeneinander (ChatArea.follow_fanout)."""
+
+    columns = ListProperty()
+
+    def __init__(self, **kwargs):
+        super().__init__(orientation="horizontal", spacing=dp(8), **kwargs)
+        self.size_hint_y = None
+
+    def on_columns(self, instance, columns):
+        # Labels nur anlegen, wenn sich die Spaltenzahl ändert
+        while len(self.children) < len(columns):
+            bubble = ChatBubble(role="ai")
+            bubble.size_hint_y = 1
+            self.add_widget(bubble)
+        while len(self.children) > len(columns):
+            self.remove_widget(self.children[0])
+        for label, column in zip(reversed(self.children), columns):
+            label.text = column_label(column)
+
+
+Factory.register("ParallelRow", cls=ParallelRow)
+
+
+class ChatArea(RecycleView):
+    """
+    Virtualisierter Chatverlauf + Autoscroll.
+    Nur sichtbare Zeilen bekommen ein Widget; die Nachrichten selbst liegen
+    als Dicts in `self.data`, inklusive zwischengespeicherter Höhe.
+    Ältere Nachrichten lädt die Coroutine `history_source(cursor, n)` (z.B.
+    MemoryController.page_before_async) beim Scrollen an den oberen Rand
+    nach; Zeilen mit `msg_id` (Datenbank-id) bestimmen, wo es weitergeht.
+    Modellvergleiche (controller.fanout) erscheinen als ParallelRow mit
+    einer Spalte je Modell. Lange gestreamte Antworten belegen mehrere
+    Zeilen (split_stream_text), nur die letzte wächst noch.
+    """
+
+    history_source = ObjectProperty(None)
+    page_size = 30
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.chat_layout = BoxLayout(orientation='vertical', spacing=dp(8), size_hint_y=None)
-        self.chat_layout.bind(minimum_height=self.chat_layout.setter('height'))
-        self.add_widget(self.chat_layout)
-        self.bubbles = []
+        self.viewclass = ChatBubble
+        # Einträge mit 'viewclass' (z.B. ParallelRow) weichen vom Standard ab
+        self.key_viewclass = "viewclass"
+        self.layout = RecycleBoxLayout(
+            orientation="vertical",
+            spacing=dp(8),
+            default_size=(None, dp(56)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+        )
+        self.layout.bind(minimum_height=self.layout.setter("height"))
+        self.add_widget(self.layout)
+
+        # Höhen-Cache je (Nachricht, Breite), damit Rotation nicht neu misst
+        self._heights = {}
+        self._msg_keys = count()
+        self._measured_width = 0
+        # Zeilen (msg_key), die nach einer Breitenänderung noch neu zu messen sind
+        self._remeasure_keys = []
+        self._remeasure_trigger = Clock.create_trigger(self._remeasure_batch, 0)
+        # Laufende Generation (controller.generation), deren Tokens angezeigt werden
+        self._generation = None
+        # Cursor für die nächste ältere Seite; False = Anfang erreicht
+        self._history_cursor = None
+        self._history_task = None
+        # Streaming: Tokens sammeln und höchstens einmal pro Frame anzeigen
+        self._parts = []
+        self._pending = []
+        self._flush_trigger = Clock.create_trigger(self._flush_tokens, 0)
+        # Gesetzt, sobald ein Frame die Tokens übernommen hat (Backpressure für follow)
+        self._flushed = None
+        # Modellvergleich: msg_key der Zeile, Spalten und deren Token-Puffer
+        self._fanout = None
+        self._fanout_key = None
+        self._columns = []
+        self._fanout_trigger = Clock.create_trigger(self._flush_columns, 0)
+        self.bind(width=self._on_width)
+        self.bind(scroll_y=self._on_scroll)
+
+    @property
+    def messages(self):
+        return self.data
+
+    def _height_for(self, msg_key, text):
+        width = self.width
+        key = (msg_key, width)
+        height = self._heights.get(key)
+        if height is None:
+            height = measure_height(text, width)
+            self._heights[key] = height
+        return height
+
+    def _row_height(self, msg_key, columns):
+        width = self.width
+        key = (msg_key, width)
+        height = self._heights.get(key)
+        if height is None:
+            column_width = (width - dp(8) * (len(columns) - 1)) / max(len(columns), 1)
+            height = max(
+                measure_height(column_label(column), column_width) for column in columns
+            )
+            self._heights[key] = height
+        return height
 
-    def add_bubble(self, role, text):
-        bubble = ChatBubble(role, text, size_hint_x=0.9)
-        self.chat_layout.add_widget(bubble)
-        self.bubbles.append(bubble)
-        Clock.schedule_once(lambda *_: self.scroll_to(bubble), 0.01)
+    def _item_height(self, item):
+        if item.get("viewclass") == "ParallelRow":
+            return self._row_height(item["msg_key"], item["columns"])
+        return self._height_for(item["msg_key"], item["text"])
+
+    def _on_width(self, *args):
+        if self.width == self._measured_width or not self.data:
+            return
+        self._measured_width = self.width
+        # Sichtbare Zeilen (plus eine Bildschirmhöhe Rand) sofort neu messen,
+        # den Rest nach Abstand zur Ansicht in Batches über die folgenden Frames
+        first, last = self._visible_range(self.height)
+        order = sorted(
+            range(len(self.data)),
+            key=lambda index: max(first - index, index - last, 0),
+        )
+        visible = last - first + 1
+        self._remeasure_keys = [self.data[index]["msg_key"] for index in order]
+        self._remeasure(visible)
+        if self._remeasure_keys:
+            self._remeasure_trigger()
+
+    def _visible_range(self, margin):
+        """Erster und letzter Index der Zeilen im Sichtbereich ± `margin`."""
+        spacing = self.layout.spacing
+        heights = [item["height"] for item in self.data]
+        content = sum(heights) + spacing * (len(heights) - 1)
+        top = (1 - self.scroll_y) * max(content - self.height, 0) - margin
+        bottom = top + self.height + 2 * margin
+        first, last, y = None, 0, 0
+        for index, height in enumerate(heights):
+            if y > bottom:
+                break
+            if first is None and y + height >= top:
+                first = index
+            last = index
+            y += height + spacing
+        return (last if first is None else first), last
+
+    def _remeasure(self, count):
+        """Misst die nächsten `count` Zeilen aus `_remeasure_keys` für die aktuelle Breite."""
+        keys, self._remeasure_keys = (
+            self._remeasure_keys[:count],
+            self._remeasure_keys[count:],
+        )
+        wanted = set(keys)
+        data = list(self.data)
+        changed = False
+        for index, item in enumerate(data):
+            if item["msg_key"] in wanted:
+                height = self._item_height(item)
+                if height != item["height"]:
+                    data[index] = dict(item, height=height)
+                    changed = True
+        if changed:
+            self.data = data
+
+    def _remeasure_batch(self, *args):
+        self._remeasure(REMEASURE_BATCH)
+        if self._remeasure_keys:
+            self._remeasure_trigger()
+
+    def _at_bottom(self):
+        return self.scroll_y <= 0.01 or self.layout.height <= self.height
+
+    def add_bubble(self, role, text, msg_id=None):
+        self._finish_pending()
+        msg_key = next(self._msg_keys)
+        follow = self._at_bottom()
+        self.data.append(
+            {
+                "role": role,
+                "text": text,
+                "msg_key": msg_key,
+                "msg_id": msg_id,
+                "height": self._height_for(msg_key, text),
+            }
+        )
+        self._parts = [text] if text else []
+        if follow:
+            Clock.schedule_once(lambda *_: setattr(self, "scroll_y", 0), 0.01)
 
     def stream_token(self, role, token):
-        if not self.bubbles or self.bubbles[-1].role != role:
+        if not self.data or self.data[-1]["role"] != role:
             self.add_bubble(role, "")
-        self.bubbles[-1].append_token(token)
+        self._pending.append(token)
+        self._flush_trigger()
+
+    def _flush_tokens(self, *args):
+        if not self._pending or not self.data:
+            return
+        if self._flushed is not None:
+            self._flushed.set()
+        with metrics.timer("ui.flush"):
+            self._apply_tokens()
+
+    def _apply_tokens(self):
+        # `_parts` hält nur den offenen Rest; fertige Abschnitte sind eigene
+        # Zeilen mit fester Höhe, so bleibt der Aufwand je Frame konstant
+        self._parts.extend(self._pending)
+        self._pending.clear()
+        chunks, tail = split_stream_text("".join(self._parts))
+        self._parts = [tail] if tail else []
+
+        index = len(self.data) - 1
+        item = self.data[index]
+        texts = chunks + [tail]
+        self._heights.pop((item["msg_key"], self.width), None)
+        follow = self._at_bottom()
+        self.data[index] = dict(
+            item, text=texts[0], height=self._height_for(item["msg_key"], texts[0])
+        )
+        for text in texts[1:]:
+            msg_key = next(self._msg_keys)
+            self.data.append(
+                {
+                    "role": item["role"],
+                    "text": text,
+                    "msg_key": msg_key,
+                    "msg_id": None,
+                    "height": self._height_for(msg_key, text),
+                }
+            )
+        if follow:
+            self.scroll_y = 0
+
+    def _finish_pending(self):
+        self._flush_trigger.cancel()
+        self._flush_tokens()
+
+    def finish_stream(self, role):
+        """Restliche Tokens sofort anzeigen (Ende des Streams)."""
+        if self.data and self.data[-1]["role"] == role:
+            self._finish_pending()
+
+    def follow(self, generation, role="ai"):
+        """
+        Zeigt die Tokens einer Generation an, bis sie endet oder abgebrochen wird.
+        Der nächste Batch wird erst geholt, wenn ein Frame den vorigen
+        übernommen hat; ist die UI langsamer, füllt sich Generation.queue
+        und der Producer hört auf, vom Socket zu lesen.
+        """
+        self.cancel_stream()
+        self._generation = generation
+        flushed = self._flushed = asyncio.Event()
+
+        async def consume():
+            while True:
+                batch = await generation.next_batch()
+                if not batch or self._generation is not generation:
+                    break
+                flushed.clear()
+                for token in batch:
+                    self.stream_token(role, token)
+                await flushed.wait()
+            if self._generation is generation:
+                self._generation = None
+                self.finish_stream(role)
+
+        asyncio.ensure_future(consume())
+
+    def cancel_stream(self):
+        """Bricht die angezeigte Generation ab; bereits Angezeigtes bleibt stehen."""
+        generation, self._generation = self._generation, None
+        if generation is not None:
+            generation.cancel()
+            self._finish_pending()
+        fanout, self._fanout = self._fanout, None
+        if fanout is not None:
+            fanout.cancel()
+            self._fanout_trigger.cancel()
+            self._flush_columns()
+
+    def follow_fanout(self, fanout):
+        """
+        Zeigt die Antworten eines FanOut nebeneinander in einer Zeile an.
+        Jede Spalte sammelt ihre Tokens; neu gezeichnet wird höchstens
+        einmal pro Frame, egal wie viele Modelle gleichzeitig streamen.
+        """
+        self.cancel_stream()
+        self._finish_pending()
+        self._fanout = fanout
+        self._fanout_key = next(self._msg_keys)
+        self._columns = [
+            {"model": model, "text": "", "stats": "", "parts": []}
+            for model in fanout.models
+        ]
+        follow = self._at_bottom()
+        self.data.append(self._fanout_item())
+        if follow:
+            Clock.schedule_once(lambda *_: setattr(self, "scroll_y", 0), 0.01)
+
+        async def consume(column, generation):
+            while True:
+                batch = await generation.next_batch()
+                if not batch or self._fanout is not fanout:
+                    break
+                column["parts"].extend(batch)
+                self._fanout_trigger()
+            if self._fanout is fanout:
+                column["stats"] = format_stats(fanout.report()[column["model"]])
+                self._fanout_trigger()
+
+        async def consume_all():
+            await asyncio.gather(
+                *(
+                    consume(column, fanout.generations[column["model"]])
+                    for column in self._columns
+                )
+            )
+            if self._fanout is fanout:
+                self._fanout = None
+                self._fanout_trigger.cancel()
+                self._flush_columns()
+
+        asyncio.ensure_future(consume_all())
+
+    def _fanout_item(self):
+        columns = [
+            {"model": c["model"], "text": c["text"], "stats": c["stats"]}
+            for c in self._columns
+        ]
+        msg_key = self._fanout_key
+        self._heights.pop((msg_key, self.width), None)
+        return {
+            "viewclass": "ParallelRow",
+            "role": "parallel",
+            "text": "",
+            "columns": columns,
+            "msg_key": msg_key,
+            "height": self._row_height(msg_key, columns),
+        }
+
+    def _flush_columns(self, *args):
+        if self._fanout_key is None:
+            return
+        for column in self._columns:
+            if column["parts"]:
+                column["text"] += "".join(column["parts"])
+                column["parts"].clear()
+        # Die Zeile ist meist die letzte, kann aber überholt worden sein
+        for index in range(len(self.data) - 1, -1, -1):
+            if self.data[index]["msg_key"] == self._fanout_key:
+                follow = self._at_bottom()
+                self.data[index] = self._fanout_item()
+                if follow:
+                    self.scroll_y = 0
+                break
+
+    def clear(self):
+        self.cancel_stream()
+        self._flush_trigger.cancel()
+        self._pending.clear()
+        self._parts = []
+        self._fanout_key = None
+        self._columns = []
+        self._heights.clear()
+        self._remeasure_trigger.cancel()
+        self._remeasure_keys = []
+        self._history_cursor = None
+        if self._history_task is not None:
+            self._history_task.cancel()
+            self._history_task = None
+        self.data = []
+
+    def _on_scroll(self, *args):
+        if self.scroll_y >= 0.99 and self.data:
+            self.load_older()
+
+    def load_older(self):
+        """
+        Lädt die nächste ältere Seite im Hintergrund und stellt sie voran;
+        liefert den Task (oder None, wenn es nichts zu laden gibt).
+        Ohne Cursor geht es vor der ältesten angezeigten Nachricht mit
+        `msg_id` weiter, bei leerer Ansicht mit den neuesten Nachrichten.
+        """
+        if (
+            self.history_source is None
+            or self._history_task is not None
+            or self._history_cursor is False
+        ):
+            return None
+        cursor = self._history_cursor
+        if cursor is None and self.data:
+            cursor = self._oldest_shown_id()
+            if cursor is None:
+                # Nur live hinzugefügte Zeilen: deren Position im Verlauf ist unbekannt
+                return None
+        self._history_task = asyncio.ensure_future(self._load_page(cursor))
+        return self._history_task
+
+    def _oldest_shown_id(self):
+        return next(
+            (item["msg_id"] for item in self.data if item.get("msg_id") is not None),
+            None,
+        )
+
+    async def _load_page(self, cursor):
+        try:
+            rows = await self.history_source(cursor, self.page_size)
+        finally:
+            if self._history_task is asyncio.current_task():
+                self._history_task = None
+        if not rows:
+            self._history_cursor = False
+            return
+        self._history_cursor = rows[0][0]
+        self.prepend_messages(
+            [(sender, content, msg_id) for msg_id, _, sender, content in rows]
+        )
+
+    def prepend_messages(self, messages):
+        """
+        Stellt (role, text)- bzw. (role, text, msg_id)-Tupel voran, ohne die
+        Scrollposition zu verschieben.
+        """
+        items = []
+        for role, text, *msg_id in messages:
+            msg_key = next(self._msg_keys)
+            items.append(
+                {
+                    "role": "user" if role == "user" else "ai",
+                    "text": text,
+                    "msg_key": msg_key,
+                    "msg_id": msg_id[0] if msg_id else None,
+                    "height": self._height_for(msg_key, text),
+                }
+            )
+        added = sum(item["height"] for item in items) + dp(8) * len(items)
+        self.data = items + list(self.data)
+
+        def keep_position(*_):
+            scrollable = self.layout.height - self.height
+            if scrollable > 0:
+                self.scroll_y = max(0, 1 - added / scrollable)
+
+        Clock.schedule_once(keep_position, 0)
+
+    def set_history_cursor(self, cursor):
+        """Cursor (id der ältesten angezeigten Nachricht) für load_older setzen."""
+        self._history_cursor = cursor
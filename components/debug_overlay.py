@@ -0,0 +1,77 @@
+from kivy.uix.label import Label
+from kivy.clock import Clock
+from kivy.metrics import dp
+from kivy.properties import BooleanProperty
+
+from controller import metrics
+
+
+def format_snapshot(snapshot):
+    """Kompakte Textansicht eines metrics.snapshot() für das Overlay."""
+    lines = []
+    for name, value in sorted(snapshot["ratios"].items()):
+        lines.append(f"{name}: {value:.0%}")
+    for name, h in sorted(snapshot["histograms"].items()):
+        if h["p50"] is None:
+            continue
+        if name.endswith("tokens_per_second"):
+            lines.append(f"{name}: {h['p50']:.0f}/s (n={h['count']})")
+        else:
+            lines.append(
+                f"{name}: p50 {h['p50'] * 1000:.1f} ms, "
+                f"p95 {h['p95'] * 1000:.1f} ms (n={h['count']})"
+            )
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines) or "Noch keine Messwerte"
+
+
+class DebugOverlay(Label):
+    """
+    Halbtransparente Metrik-Anzeige (controller.metrics), z.B. über dem Chat.
+    Misst solange sie aktiv ist auch die Frame-Zeit (`ui.frame_time`) und
+    schaltet die Metriken beim Aktivieren ein.
+    """
+
+    active = BooleanProperty(False)
+    refresh_interval = 1.0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.font_size = "11sp"
+        self.color = (0.6, 1, 0.6, 1)
+        self.halign = "left"
+        self.valign = "top"
+        self.padding = (dp(6), dp(6))
+        self.opacity = 0
+        self._events = []
+        self.bind(size=self._update_text_size)
+
+    def _update_text_size(self, *args):
+        self.text_size = self.size
+
+    def toggle(self):
+        self.active = not self.active
+
+    def on_active(self, instance, active):
+        for event in self._events:
+            event.cancel()
+        self._events = []
+        self.opacity = 1 if active else 0
+        if active:
+            metrics.enable()
+            self._events = [
+                Clock.schedule_interval(self._on_frame, 0),
+                Clock.schedule_interval(self.refresh, self.refresh_interval),
+            ]
+            self.refresh()
+
+    def _on_frame(self, dt):
+        metrics.observe("ui.frame_time", dt)
+
+    def refresh(self, *args):
+        self.text = format_snapshot(metrics.snapshot())
+
+    def export(self, path):
+        """Aktuellen Snapshot als JSON speichern (z.B. für Fehlerberichte)."""
+        return metrics.dump(path)
@@ -1,35 +1,53 @@
 from kivy.uix.spinner import Spinner
 from kivy.clock import Clock
 from kivy.properties import ObjectProperty
-from controller.network import OpenRouterClient
+from controller.catalogue import ModelCatalogue
 import asyncio
 
+
 class ModelDropdown(Spinner):
     """
-    Dynamisch gefüllte Dropdown-Liste aller OpenRouter-Modelle.
-    Meldet Auswahl via `on_model_selected(model_id)`
+    Dropdown-Liste aller OpenRouter-Modelle.
+    Wird sofort aus dem gespeicherten Katalog gefüllt und im Hintergrund
+    aktualisiert. Meldet Auswahl via `on_model_selected(model_id)`
     """
+
     on_model_selected = ObjectProperty(None)
+    catalogue = ObjectProperty(None)
+    # GenerationManager: laufende Antwort beim Modellwechsel abbrechen
+    generations = ObjectProperty(None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.text = "Modelle laden…"
-        self.values = []
+        if self.catalogue is None:
+            self.catalogue = ModelCatalogue()
+        self.values = self.catalogue.ids
+        self.text = "Modell wählen" if self.values else "Modelle laden…"
         Clock.schedule_once(lambda _: self.load_models(), 1)
 
-    def load_models(self):
+    def load_models(self, force=False):
         async def fetch():
-            client = OpenRouterClient()
+            # httpx erst hier laden, nicht beim Start der App
+            from controller.network import get_shared_client
+
+            client = get_shared_client()
             try:
-                models = await client.fetch_models()
-                choices = sorted(set(m["id"] for m in models))
-                self.values = choices
-                self.text = "Modell wählen"
+                if await self.catalogue.refresh(client, force=force):
+                    self.values = self.catalogue.ids
+                if self.text == "Modelle laden…":
+                    self.text = "Modell wählen"
             except Exception:
-                self.text = "Fehler beim Laden"
+                if not self.values:
+                    self.text = "Fehler beim Laden"
 
         asyncio.ensure_future(fetch())
 
     def on_text(self, instance, value):
-        if self.on_model_selected and value not in ("Modelle laden…", "Modell wählen"):
+        if self.on_model_selected and value not in (
+            "Modelle laden…",
+            "Modell wählen",
+            "Fehler beim Laden",
+        ):
+            if self.generations is not None:
+                self.generations.cancel_current()
             self.on_model_selected(value)
@@ -0,0 +1,222 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryLRU:
+    """
+    Bounded in-process LRU that sits in front of the on-disk ResponseCache.
+    Limited both by entry count and by the total size of the stored values.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=2 * 1024 * 1024, max_age=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+    def get(self, key):
+        """Returns the cached value and marks it as most recently used."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, size, created = entry
+            if time.time() - created >= self.max_age:
+                del self.entries[key]
+                self.total_bytes -= size
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, created=None):
+        """Stores `value`, evicting the least recently used entries if needed."""
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self.entries[key] = (value, size, created or time.time())
+            self.total_bytes += size
+            while (
+                len(self.entries) > self.max_entries
+                or self.total_bytes > self.max_bytes
+            ):
+                _, (_, evicted, _) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ResponseCache:
+    """
+    Single-file response cache backed by SQLite.
+    Entries expire after `max_age` seconds and, once the store grows beyond
+    `max_bytes`, are evicted in least-recently-used order. Entry count and
+    byte size are tracked in memory so stats never touch the disk.
+    """
+
+    # Access times are only rewritten when older than this, so a burst of
+    # hits on the same prompt does not turn every read into a write.
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, db_path, max_bytes=16 * 1024 * 1024, max_age=3600):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.setup_database()
+        self.entry_count, self.total_bytes = self._load_totals()
+
+    def setup_database(self):
+        """Creates the 'responses' table and its LRU index if needed."""
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                device TEXT,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed)"
+        )
+        self.connection.commit()
+
+    def _load_totals(self):
+        row = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return row[0], row[1]
+
+    def get(self, key):
+        """Returns the cached response for `key`, or None if missing or expired."""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key):
+        """Returns `(response, created)` for `key`, or None if missing or expired."""
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response, size, created, accessed FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            response, size, created, accessed = row
+            if now - created >= self.max_age:
+                self._delete(key, size)
+                self.connection.commit()
+                return None
+            if now - accessed >= self.TOUCH_INTERVAL:
+                self.connection.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                )
+                self.connection.commit()
+            return response, created
+
+    def put(self, key, response, device=None):
+        """Stores `response` under `key` and evicts entries beyond the size cap."""
+        size = len(key) + len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self.lock:
+            old = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, device, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, response, device, size, now, now),
+            )
+            if old is None:
+                self.entry_count += 1
+                self.total_bytes += size
+            else:
+                self.total_bytes += size - old[0]
+            if self.total_bytes > self.max_bytes:
+                self._evict(now)
+            self.connection.commit()
+
+    def _delete(self, key, size):
+        self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.entry_count -= 1
+        self.total_bytes -= size
+
+    def _evict(self, now):
+        """Drops expired entries first, then the least recently used ones."""
+        self._purge_expired(now)
+        # The counters drift when another ResponseCache (or process) writes
+        # to the same file; resync them so the loop below terminates
+        self.entry_count, self.total_bytes = self._load_totals()
+        while self.total_bytes > self.max_bytes and self.entry_count > 0:
+            victims = self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 32"
+            ).fetchall()
+            if not victims:
+                self.entry_count, self.total_bytes = 0, 0
+                break
+            for key, size in victims:
+                self._delete(key, size)
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def _purge_expired(self, now):
+        cutoff = now - self.max_age
+        cur = self.connection.execute(
+            "DELETE FROM responses WHERE created < ?", (cutoff,)
+        )
+        if cur.rowcount:
+            self.entry_count, self.total_bytes = self._load_totals()
+        return cur.rowcount
+
+    def purge_expired(self):
+        """Removes all expired entries and returns how many were dropped."""
+        with self.lock:
+            removed = self._purge_expired(time.time())
+            self.connection.commit()
+            return removed
+
+    def clear(self):
+        """Deletes every entry and returns how many there were."""
+        with self.lock:
+            removed = self.entry_count
+            self.connection.execute("DELETE FROM responses")
+            self.connection.commit()
+            self.entry_count = 0
+            self.total_bytes = 0
+            return removed
+
+    def info(self):
+        """Returns entry count and byte totals without querying the database."""
+        return {
+            "entries": self.entry_count,
+            "total_size": self.total_bytes,
+            "max_size": self.max_bytes,
+            "max_age": self.max_age,
+        }
+
+    def close(self):
+        """Closes the database connection."""
+        with self.lock:
+            self.connection.close()
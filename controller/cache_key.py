@@ -0,0 +1,215 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Bump when the key layout changes so old entries simply stop matching
+KEY_VERSION = 2
+
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def _case(text):
+    return text.casefold()
+
+
+def _whitespace(text):
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _punctuation(text):
+    return _PUNCTUATION.sub("", text)
+
+
+def _unicode(text):
+    return unicodedata.normalize("NFKC", text)
+
+
+# Applied in this order, whatever order the config lists them in
+NORMALIZERS = OrderedDict(
+    [
+        ("unicode", _unicode),
+        ("case", _case),
+        ("punctuation", _punctuation),
+        ("whitespace", _whitespace),
+    ]
+)
+
+DEFAULT_NORMALIZE = ("unicode", "case", "whitespace")
+
+
+def context_fingerprint(messages):
+    """Short hash over the (role, content) pairs a prompt is sent with."""
+    if not messages:
+        return ""
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(message.get("role", "").encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update((message.get("content") or "").encode("utf-8"))
+        digest.update(b"\x01")
+    return digest.hexdigest()[:16]
+
+
+def ngram_embedding(text, n=3, dim=512):
+    """
+    Local, dependency-free embedding: character n-grams hashed into `dim`
+    buckets, L2-normalized and stored sparse as {bucket: weight}.
+    Good enough to match rephrasings and typos, not synonyms.
+    """
+    padded = f" {text} "
+    counts = {}
+    for i in range(max(1, len(padded) - n + 1)):
+        gram = padded[i : i + n].encode("utf-8")
+        bucket = (
+            int.from_bytes(hashlib.blake2b(gram, digest_size=4).digest(), "little")
+            % dim
+        )
+        counts[bucket] = counts.get(bucket, 0) + 1
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {bucket: c / norm for bucket, c in counts.items()}
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+class SimilarityIndex:
+    """
+    Near-duplicate lookup over recently cached prompts. Entries are grouped
+    by scope (model, temperature, context) so a similar prompt can only
+    match answers produced under the same conditions.
+    """
+
+    def __init__(self, threshold=0.9, max_entries=1000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (scope, embedding)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, scope, text, key):
+        embedding = ngram_embedding(text)
+        with self.lock:
+            self.entries[key] = (scope, embedding)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def lookup(self, scope, text):
+        """Returns (key, similarity) of the closest prompt at or above the threshold."""
+        embedding = ngram_embedding(text)
+        best_key, best = None, self.threshold
+        with self.lock:
+            candidates = [(k, e) for k, (s, e) in self.entries.items() if s == scope]
+        for key, other in candidates:
+            similarity = cosine(embedding, other)
+            if similarity >= best:
+                best_key, best = key, similarity
+        return (best_key, best) if best_key else (None, 0.0)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class CacheKeyBuilder:
+    """
+    Builds response cache keys from everything that determines an answer:
+    model, temperature, the conversation context and the (normalized)
+    prompt. With a `similarity_threshold`, prompts that normalize
+    differently but are close enough reuse an existing key.
+    """
+
+    def __init__(
+        self,
+        normalize=DEFAULT_NORMALIZE,
+        similarity_threshold=None,
+        max_similar_entries=1000,
+    ):
+        unknown = set(normalize) - set(NORMALIZERS)
+        if unknown:
+            raise ValueError(f"Unknown normalizers: {', '.join(sorted(unknown))}")
+        self.normalizers = [fn for name, fn in NORMALIZERS.items() if name in normalize]
+        self.similar = (
+            SimilarityIndex(similarity_threshold, max_similar_entries)
+            if similarity_threshold
+            else None
+        )
+        self.stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "misses": 0}
+
+    def normalize(self, message):
+        for fn in self.normalizers:
+            message = fn(message)
+        return message
+
+    @staticmethod
+    def scope(model=None, temperature=None, context=None):
+        """Everything besides the prompt that must match for a hit."""
+        temperature = None if temperature is None else round(float(temperature), 2)
+        return (model or "", temperature, context_fingerprint(context))
+
+    def build(self, message, model=None, temperature=None, context=None):
+        return self._key(
+            self.scope(model, temperature, context), self.normalize(message)
+        )
+
+    @staticmethod
+    def _key(scope, normalized):
+        payload = json.dumps([KEY_VERSION, *scope, normalized], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def candidates(self, message, model=None, temperature=None, context=None):
+        """Exact key first, then the key of the most similar known prompt (if enabled)."""
+        scope = self.scope(model, temperature, context)
+        normalized = self.normalize(message)
+        key = self._key(scope, normalized)
+        keys = [key]
+        if self.similar is not None:
+            similar, _ = self.similar.lookup(scope, normalized)
+            if similar and similar != key:
+                keys.append(similar)
+        return keys
+
+    def remember(self, message, key, model=None, temperature=None, context=None):
+        """Makes `message` findable by similarity once its answer is cached."""
+        if self.similar is not None:
+            self.similar.add(
+                self.scope(model, temperature, context), self.normalize(message), key
+            )
+
+    def clear(self):
+        """Forgets the prompts known for similarity lookups."""
+        if self.similar is not None:
+            self.similar.clear()
+
+    def record(self, hit_index):
+        """Counts a lookup: 0 = exact hit, 1 = similar hit, None = miss."""
+        self.stats["lookups"] += 1
+        if hit_index is None:
+            self.stats["misses"] += 1
+        elif hit_index == 0:
+            self.stats["exact_hits"] += 1
+        else:
+            self.stats["similar_hits"] += 1
+
+    def report(self):
+        lookups = self.stats["lookups"]
+        hits = self.stats["exact_hits"] + self.stats["similar_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "similar_entries": len(self.similar) if self.similar is not None else 0,
+        }
@@ -0,0 +1,132 @@
+import json
+import os
+import time
+
+DEFAULT_TTL = 6 * 3600
+
+
+def _price(pricing, key):
+    try:
+        return float((pricing or {}).get(key) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ModelCatalogue:
+    """
+    OpenRouter model list persisted on disk, so the UI can show it instantly
+    at startup. `refresh()` revalidates with If-None-Match/If-Modified-Since
+    once the TTL has passed; an unchanged list costs a 304 without a body.
+
+    Models are kept as small dicts (id, name, provider, context_length,
+    prompt_price, completion_price) and indexed by id and provider, with
+    precomputed orderings by id, context length and prompt price.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        self.path = path or os.path.join(os.getcwd(), "cache", "models.json")
+        self.ttl = ttl
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+        self.set_models([])
+        self.load()
+
+    def load(self):
+        """Reads the catalogue file; a missing or broken file leaves it empty."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.etag = data.get("etag")
+        self.last_modified = data.get("last_modified")
+        self.fetched_at = data.get("fetched_at", 0)
+        self.set_models(data.get("models", []))
+        return True
+
+    def save(self):
+        """Writes the catalogue atomically (temp file + rename)."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "models": self.models,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def set_models(self, models):
+        """Replaces the model list and rebuilds the indexes."""
+        self.models = sorted(models, key=lambda m: m["id"])
+        self.by_id = {m["id"]: m for m in self.models}
+        self.ids = [m["id"] for m in self.models]
+        self.by_provider = {}
+        for m in self.models:
+            self.by_provider.setdefault(m["provider"], []).append(m)
+        self.by_context_length = sorted(self.models, key=lambda m: -m["context_length"])
+        self.by_price = sorted(self.models, key=lambda m: (m["prompt_price"], m["id"]))
+
+    @staticmethod
+    def normalize(raw):
+        """Reduces an OpenRouter /models entry to the fields the app uses."""
+        model_id = raw["id"]
+        return {
+            "id": model_id,
+            "name": raw.get("name") or model_id,
+            "provider": model_id.split("/", 1)[0] if "/" in model_id else "",
+            "context_length": int(raw.get("context_length") or 0),
+            "prompt_price": _price(raw.get("pricing"), "prompt"),
+            "completion_price": _price(raw.get("pricing"), "completion"),
+        }
+
+    def is_stale(self, now=None):
+        return (now or time.time()) - self.fetched_at >= self.ttl
+
+    async def refresh(self, client, force=False):
+        """
+        Revalidates against `/models` if stale (or `force`).
+        Returns True if the model list changed.
+        """
+        if not force and self.models and not self.is_stale():
+            return False
+        status, models, etag, last_modified = await client.fetch_models_conditional(
+            etag=self.etag if self.models else None,
+            last_modified=self.last_modified if self.models else None,
+        )
+        self.fetched_at = time.time()
+        changed = False
+        if status != 304:
+            normalized = [self.normalize(m) for m in models if m.get("id")]
+            changed = normalized != self.models
+            self.set_models(normalized)
+            self.etag = etag
+            self.last_modified = last_modified
+        self.save()
+        return changed
+
+    def filter(self, provider=None, min_context=0, max_prompt_price=None):
+        """Models matching all given criteria, cheapest first."""
+        models = self.by_provider.get(provider, []) if provider else self.models
+        return sorted(
+            (
+                m
+                for m in models
+                if m["context_length"] >= min_context
+                and (max_prompt_price is None or m["prompt_price"] <= max_prompt_price)
+            ),
+            key=lambda m: (m["prompt_price"], m["id"]),
+        )
+
+    def context_length(self, model_id):
+        model = self.by_id.get(model_id)
+        return model["context_length"] if model else None
+
+    def context_lengths(self):
+        """{model_id: context_length} for ContextBuilder."""
+        return {
+            m["id"]: m["context_length"] for m in self.models if m["context_length"]
+        }
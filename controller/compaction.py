@@ -0,0 +1,95 @@
+import asyncio
+
+from controller.context import ROLES, SUMMARY_PREFIX
+
+SUMMARY_PROMPT = (
+    "Fasse das folgende Gespräch knapp zusammen. Behalte Fakten, Entscheidungen, "
+    "Namen und offene Fragen; lass Smalltalk weg. Antworte nur mit der Zusammenfassung."
+)
+
+
+class Compactor:
+    """
+    Replaces ranges of old messages with a rolling summary stored in the
+    memory database. `summarize(previous_summary, messages)` returns the new
+    summary text; `messages` are chat dicts ({'role', 'content'}) and
+    `previous_summary` is None for the first compaction.
+
+    ContextBuilder calls `compact()` when a window exceeds its budget and
+    trims the window down to `target_ratio` of the budget first, so the
+    summarizer runs once per several turns rather than on every message.
+    """
+
+    def __init__(self, memory, summarize, target_ratio=0.75, max_chunk_tokens=4000):
+        self.memory = memory
+        self.summarize = summarize
+        self.target_ratio = target_ratio
+        self.max_chunk_tokens = max_chunk_tokens
+
+    def compact(self, previous, rows, conversation_id=None):
+        """
+        Folds `rows` ((id, sender, content, token_count) tuples, oldest
+        first) into `previous` and stores the result. Returns the new
+        summary as (id, start_id, end_id, content, token_count).
+        """
+        text = previous[3] if previous else None
+        for chunk in self._chunks(rows):
+            messages = [
+                {"role": ROLES.get(sender, "user"), "content": content}
+                for _, sender, content, _ in chunk
+            ]
+            text = self.summarize(text, messages)
+        start_id = previous[1] if previous else rows[0][0]
+        return self.memory.add_summary(start_id, rows[-1][0], text, conversation_id)
+
+    def _chunks(self, rows):
+        chunk, tokens = [], 0
+        for row in rows:
+            if chunk and tokens + row[3] > self.max_chunk_tokens:
+                yield chunk
+                chunk, tokens = [], 0
+            chunk.append(row)
+            tokens += row[3]
+        if chunk:
+            yield chunk
+
+
+def extractive_summarizer(previous, messages, max_chars=1200):
+    """
+    Local summarizer without API calls: keeps the first sentence of each
+    message. Serves as offline fallback and as stub in tests.
+    """
+    lines = [previous] if previous else []
+    for message in messages:
+        first = message["content"].strip().split("\n", 1)[0]
+        sentence = first.split(". ", 1)[0][:160]
+        lines.append(f"{message['role']}: {sentence}")
+    text = "\n".join(lines)
+    return text[-max_chars:]
+
+
+class OpenRouterSummarizer:
+    """
+    Summarizes through OpenRouterClient.complete on the app's event loop.
+    Blocking by design: call it from a worker thread (e.g. run
+    ContextBuilder.build via asyncio.to_thread), never from the loop itself.
+    """
+
+    def __init__(self, client, model, loop, timeout=60):
+        self.client = client
+        self.model = model
+        self.loop = loop
+        self.timeout = timeout
+
+    def __call__(self, previous, messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        if previous:
+            transcript = f"{SUMMARY_PREFIX}{previous}\n\n{transcript}"
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": transcript},
+        ]
+        future = asyncio.run_coroutine_threadsafe(
+            self.client.complete(self.model, prompt), self.loop
+        )
+        return future.result(self.timeout)
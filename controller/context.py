@@ -0,0 +1,194 @@
+import math
+from collections import deque
+
+# Tokens the chat format adds around every message (role, separators)
+MESSAGE_OVERHEAD = 4
+# Tokens kept free for the model's answer
+DEFAULT_RESERVE = 1024
+DEFAULT_CONTEXT_LENGTH = 8192
+
+ROLES = {
+    "user": "user",
+    "ai": "assistant",
+    "assistant": "assistant",
+    "system": "system",
+}
+
+SUMMARY_PREFIX = "Zusammenfassung des bisherigen Gesprächs:\n"
+
+
+def estimate_tokens(text):
+    """
+    Fast local token estimate for BPE-style tokenizers: roughly four ASCII
+    characters per token, while non-ASCII characters (umlauts, emoji, CJK)
+    usually cost a token each or more. Includes the per-message overhead.
+    """
+    if not text:
+        return MESSAGE_OVERHEAD
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    other = len(text) - ascii_chars
+    return math.ceil(ascii_chars / 4 + other / 1.5) + MESSAGE_OVERHEAD
+
+
+class _Window:
+    """Messages currently selected for one (conversation, model) pair."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.rows = deque()
+        self.total = 0
+        self.last_id = 0
+        # (id, start_id, end_id, content, token_count) of the active summary
+        self.summary = None
+
+    def trim(self):
+        # Always keep the newest message, even if it alone exceeds the budget
+        while self.total > self.budget and len(self.rows) > 1:
+            self.total -= self.rows.popleft()[3]
+
+
+class ContextBuilder:
+    """
+    Assembles the `messages` payload for a model from MemoryController's
+    history, newest first, up to the model's token budget.
+
+    Token counts are stored per message in the database, and the selected
+    window is kept between calls, so each build only reads the messages
+    added since the previous one and drops the oldest from the front.
+
+    With a `compactor` (see controller.compaction), messages that fall out
+    of the window are folded into a stored summary that is sent as a system
+    message in their place instead of being forgotten.
+    """
+
+    def __init__(
+        self,
+        memory,
+        context_lengths=None,
+        reserve=DEFAULT_RESERVE,
+        default_context_length=DEFAULT_CONTEXT_LENGTH,
+        page_size=50,
+        compactor=None,
+    ):
+        self.memory = memory
+        self.compactor = compactor
+        self.context_lengths = dict(context_lengths or {})
+        self.reserve = reserve
+        self.default_context_length = default_context_length
+        self.page_size = page_size
+        self._windows = {}
+
+    def set_context_length(self, model, tokens):
+        """Sets the context length of `model`, e.g. from the model catalogue."""
+        self.context_lengths[model] = tokens
+
+    def budget_for(self, model, system_prompt=None):
+        length = self.context_lengths.get(model) or self.default_context_length
+        budget = length - self.reserve
+        if system_prompt:
+            budget -= estimate_tokens(system_prompt)
+        return max(budget, 0)
+
+    def build(self, model, system_prompt=None, conversation_id=None):
+        """Returns the chat `messages` list for `model` within its token budget."""
+        conversation_id = conversation_id or self.memory.conversation_id
+        budget = self.budget_for(model, system_prompt)
+        key = (conversation_id, model)
+        window = self._windows.get(key)
+        if window is None or window.budget != budget:
+            window = self._fill(budget, conversation_id)
+            self._windows[key] = window
+        else:
+            rows = self.memory.context_rows_after(window.last_id, conversation_id)
+            for row in rows:
+                window.rows.append(row)
+                window.total += row[3]
+            if rows:
+                window.last_id = rows[-1][0]
+            self._trim(window, conversation_id)
+
+        messages = (
+            [{"role": "system", "content": system_prompt}] if system_prompt else []
+        )
+        if window.summary:
+            messages.append(
+                {"role": "system", "content": SUMMARY_PREFIX + window.summary[3]}
+            )
+        messages.extend(
+            {"role": ROLES.get(sender, "user"), "content": content}
+            for _, sender, content, _ in window.rows
+        )
+        return messages
+
+    def window_tokens(self, model, conversation_id=None):
+        """Token total of the current window for `model` (0 before the first build)."""
+        conversation_id = conversation_id or self.memory.conversation_id
+        window = self._windows.get((conversation_id, model))
+        return window.total if window else 0
+
+    def reset(self, conversation_id=None):
+        """Forgets cached windows, e.g. after history was deleted."""
+        if conversation_id is None:
+            self._windows.clear()
+        else:
+            for key in [k for k in self._windows if k[0] == conversation_id]:
+                del self._windows[key]
+
+    def _fill(self, budget, conversation_id):
+        """Walks the history backwards page by page until the budget is used."""
+        window = _Window(budget)
+        floor = 0
+        if self.compactor is not None:
+            window.summary = self.memory.latest_summary(conversation_id)
+            if window.summary:
+                floor = window.summary[2]
+                window.total = window.summary[4]
+
+        cursor = None
+        full = False
+        while not full:
+            rows = self.memory.context_rows_before(
+                cursor, self.page_size, conversation_id
+            )
+            if not rows:
+                break
+            if window.last_id == 0:
+                window.last_id = rows[-1][0]
+            for row in reversed(rows):
+                if row[0] <= floor:
+                    # Already covered by the summary
+                    return window
+                if window.rows and window.total + row[3] > budget:
+                    full = True
+                    break
+                window.rows.appendleft(row)
+                window.total += row[3]
+            cursor = rows[0][0]
+
+        if full and self.compactor is not None:
+            # Older messages not yet in any summary
+            older = self.memory.context_rows_after(
+                floor, conversation_id, until=window.rows[0][0]
+            )
+            if older:
+                self._compact(window, conversation_id, older)
+            self._trim(window, conversation_id)
+        return window
+
+    def _trim(self, window, conversation_id):
+        if self.compactor is None:
+            window.trim()
+            return
+        target = window.budget * self.compactor.target_ratio
+        while window.total > window.budget and len(window.rows) > 1:
+            dropped = []
+            while window.total > target and len(window.rows) > 1:
+                row = window.rows.popleft()
+                window.total -= row[3]
+                dropped.append(row)
+            self._compact(window, conversation_id, dropped)
+
+    def _compact(self, window, conversation_id, rows):
+        old = window.summary
+        window.summary = self.compactor.compact(old, rows, conversation_id)
+        window.total += window.summary[4] - (old[4] if old else 0)
@@ -0,0 +1,135 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from controller import metrics
+
+_STOP = object()
+
+
+class DatabaseWorker:
+    """
+    Runs all work for one SQLite database on a single dedicated thread.
+    Jobs are callables receiving the connection; they execute in submission
+    order and hand their result back through a Future, so callers on the
+    Kivy main loop, executor threads or asyncio tasks never share a
+    connection or block on each other's locks.
+
+    Write jobs are group-committed: the transaction is committed once
+    `batch_size` writes are pending or the oldest pending write has waited
+    `commit_interval` seconds. A batch_size of 1 commits every write.
+    """
+
+    def __init__(self, connect, batch_size=1, commit_interval=1.0, name="aiDroid-db"):
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.jobs = queue.Queue()
+        self.uncommitted = 0
+        self._first_uncommitted = None
+        self._connect = connect
+        self.connection = None
+        self._ready = Future()
+        # Guards `closed` so no job is queued behind the stop marker
+        self._lock = threading.Lock()
+        self.closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        # Surface connection errors in the constructing thread
+        self._ready.result()
+
+    def in_worker(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn, *args, write=False):
+        """
+        Queues `fn(connection, *args)` and returns a Future for its result.
+        Raises sqlite3.ProgrammingError once the worker has been closed.
+        """
+        future = Future()
+        if self.in_worker():
+            self._execute(future, fn, args, write)
+            return future
+        with self._lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            self.jobs.put((future, fn, args, write))
+        return future
+
+    def call(self, fn, *args, write=False):
+        """Runs `fn(connection, *args)` on the worker and waits for the result."""
+        return self.submit(fn, *args, write=write).result()
+
+    async def call_async(self, fn, *args, write=False):
+        """Awaitable variant of `call()` that never blocks the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, write=write))
+
+    def flush(self):
+        """Commits pending writes; returns how many were committed."""
+        return self.call(lambda conn: self._commit())
+
+    async def flush_async(self):
+        return await self.call_async(lambda conn: self._commit())
+
+    def close(self):
+        """Commits pending writes, stops the thread and closes the connection."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.jobs.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            self.connection = self._connect()
+        except Exception as e:
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(True)
+
+        while True:
+            timeout = None
+            if self.uncommitted:
+                timeout = max(
+                    0, self._first_uncommitted + self.commit_interval - time.monotonic()
+                )
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                self._commit()
+                continue
+            if job is _STOP:
+                break
+            self._execute(*job)
+
+        self._commit()
+        self.connection.close()
+
+    def _execute(self, future, fn, args, write):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(self.connection, *args)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if write:
+            self.uncommitted += 1
+            if self._first_uncommitted is None:
+                self._first_uncommitted = time.monotonic()
+            if self.uncommitted >= self.batch_size:
+                self._commit()
+        future.set_result(result)
+
+    def _commit(self):
+        committed = self.uncommitted
+        if self.connection is not None and self.connection.in_transaction:
+            with metrics.timer("db.commit"):
+                self.connection.commit()
+            metrics.inc("db.committed_writes", committed)
+        self.uncommitted = 0
+        self._first_uncommitted = None
+        return committed
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+from controller.generation import STATUS_DONE, Generation
+
+FANOUT_ALL = "all"
+FANOUT_FIRST = "first"
+
+
+class ModelStats:
+    """Timing for one model of a fan-out."""
+
+    def __init__(self, model):
+        self.model = model
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+
+    @property
+    def ttft(self):
+        """Seconds from start of the request to the first token."""
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def latency(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def tokens(self, info=None):
+        """Completion tokens as reported by the API, else streamed chunks."""
+        usage = info.usage if info is not None else None
+        if usage and usage.get("completion_tokens"):
+            return usage["completion_tokens"]
+        return self.chunks
+
+    def tokens_per_second(self, info=None):
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        duration = self.finished_at - self.first_token_at
+        return self.tokens(info) / duration if duration > 0 else None
+
+
+class _LimitedClient:
+    """Wraps a client so at most `semaphore` streams run at once, with timing."""
+
+    def __init__(self, client, semaphore, stats):
+        self.client = client
+        self.semaphore = semaphore
+        self.stats = stats
+
+    async def stream(self, model, messages, info=None):
+        stats = self.stats[model]
+        async with self.semaphore:
+            stats.started_at = time.perf_counter()
+            try:
+                async for token in self.client.stream(model, messages, info=info):
+                    if stats.first_token_at is None:
+                        stats.first_token_at = time.perf_counter()
+                    stats.chunks += 1
+                    yield token
+            finally:
+                stats.finished_at = time.perf_counter()
+
+
+class FanOut:
+    """
+    Streams the same `messages` to several models concurrently over the
+    client's shared connection pool, at most `concurrency` at a time.
+
+    Each model gets its own Generation (see controller.generation), so the
+    UI consumes them exactly like a single answer. In FANOUT_FIRST mode the
+    first model to finish successfully wins and the others are cancelled.
+    """
+
+    def __init__(
+        self, client, models, messages, concurrency=4, mode=FANOUT_ALL, queue_size=64
+    ):
+        if mode not in (FANOUT_ALL, FANOUT_FIRST):
+            raise ValueError(f"Unknown fan-out mode: {mode}")
+        self.models = list(dict.fromkeys(models))
+        self.mode = mode
+        self.winner = None
+        self.stats = {model: ModelStats(model) for model in self.models}
+        limited = _LimitedClient(client, asyncio.Semaphore(concurrency), self.stats)
+        self.generations = {
+            model: Generation(limited, model, messages, queue_size=queue_size)
+            for model in self.models
+        }
+        self._first_done = None
+
+    def start(self):
+        self._first_done = asyncio.get_running_loop().create_future()
+        for model, generation in self.generations.items():
+            generation.start()
+            generation.task.add_done_callback(
+                lambda _task, model=model: self._on_done(model)
+            )
+        return self
+
+    def _on_done(self, model):
+        if self._first_done.done():
+            return
+        if self.generations[model].status == STATUS_DONE:
+            self.winner = model
+            self._first_done.set_result(model)
+            if self.mode == FANOUT_FIRST:
+                for other, generation in self.generations.items():
+                    if other != model:
+                        generation.cancel()
+        elif all(g.task.done() for g in self.generations.values()):
+            # Every model failed or was cancelled
+            self._first_done.set_result(None)
+
+    def cancel(self):
+        for generation in self.generations.values():
+            generation.cancel()
+
+    async def wait(self):
+        """
+        FANOUT_ALL: waits for every model and returns {model: text}.
+        FANOUT_FIRST: waits for the winner and returns {winner: text}
+        (empty if every model failed or was cancelled).
+        """
+        if self.mode == FANOUT_FIRST:
+            winner = await self._first_done
+            await asyncio.wait([g.task for g in self.generations.values()])
+            return {winner: self.generations[winner].text} if winner else {}
+        await asyncio.wait([g.task for g in self.generations.values()])
+        return {model: g.text for model, g in self.generations.items()}
+
+    def report(self):
+        """Per-model stats as plain dicts (for logs and the UI)."""
+        report = {}
+        for model, stats in self.stats.items():
+            generation = self.generations[model]
+            report[model] = {
+                "status": generation.status,
+                "ttft": stats.ttft,
+                "latency": stats.latency,
+                "tokens": stats.tokens(generation.info),
+                "tokens_per_second": stats.tokens_per_second(generation.info),
+                "error": str(generation.error) if generation.error else None,
+            }
+        return report
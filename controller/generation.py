@@ -0,0 +1,181 @@
+import asyncio
+
+from controller.sse import StreamInfo
+
+_END = object()
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+STATUS_FAILED = "failed"
+
+
+class Generation:
+    """
+    Handle for one in-flight completion.
+
+    A producer task reads OpenRouterClient.stream into a bounded queue; the
+    UI consumes it with `async for token in generation` or `next_batch()`.
+    When the queue is full the producer stops reading from the socket, so a
+    slow renderer throttles the stream instead of buffering without limit.
+
+    `cancel()` cancels the producer, which closes the HTTP stream right
+    away, and ends the consumer's iteration. Whatever arrived until then is
+    recorded in `memory` (if given) like a finished answer.
+    """
+
+    def __init__(
+        self, client, model, messages, memory=None, sender="ai", queue_size=64
+    ):
+        self.client = client
+        self.model = model
+        self.messages = messages
+        self.memory = memory
+        self.sender = sender
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.info = StreamInfo()
+        self.parts = []
+        self.status = STATUS_RUNNING
+        self.error = None
+        self.task = None
+        self._recorded = False
+        self._ended = False
+
+    def start(self):
+        self.task = asyncio.ensure_future(self._produce())
+        self.task.add_done_callback(self._finish)
+        return self
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    @property
+    def cancelled(self):
+        return self.status == STATUS_CANCELLED
+
+    async def _produce(self):
+        try:
+            async for token in self.client.stream(
+                self.model, self.messages, info=self.info
+            ):
+                self.parts.append(token)
+                await self.queue.put(token)
+        except asyncio.CancelledError:
+            self.status = STATUS_CANCELLED
+            return
+        except Exception as e:
+            self.status = STATUS_FAILED
+            self.error = e
+            return
+        self.status = STATUS_DONE
+        self._record()
+        # Wait for room instead of dropping a token the consumer has not
+        # read yet; a slow renderer still gets the complete answer
+        await self.queue.put(_END)
+        self._ended = True
+
+    def _finish(self, task):
+        if self.status == STATUS_RUNNING:
+            # Cancelled before the producer ever ran
+            self.status = STATUS_CANCELLED
+        self._record()
+        self._end()
+
+    def _record(self):
+        if self._recorded:
+            return
+        self._recorded = True
+        if self.memory is not None and self.parts:
+            # Does not wait for the write, safe inside the event loop
+            self.memory.submit_message(self.sender, self.text)
+
+    def _end(self):
+        if self._ended:
+            return
+        if self.status == STATUS_CANCELLED:
+            # Drop what the UI has not rendered yet
+            while not self.queue.empty():
+                self.queue.get_nowait()
+        try:
+            self.queue.put_nowait(_END)
+        except asyncio.QueueFull:
+            # Only reached on cancel or error: make room for the end marker
+            self.queue.get_nowait()
+            self.queue.put_nowait(_END)
+
+    def cancel(self):
+        """Stops the generation; returns False if it had already finished."""
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+    async def wait(self):
+        """
+        Waits for the producer to finish and returns the full text. After a
+        normal completion this includes queuing the end marker, so the
+        consumer must keep reading.
+        """
+        if self.task is not None:
+            await asyncio.wait({self.task})
+        return self.text
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        token = await self.queue.get()
+        if token is _END:
+            # Keep the marker for other waiters
+            self.queue.put_nowait(_END)
+            raise StopAsyncIteration
+        return token
+
+    async def next_batch(self, max_tokens=256):
+        """
+        Waits for at least one token, then returns everything queued (up to
+        `max_tokens`) so the UI can apply a whole frame's worth at once.
+        Returns an empty list when the generation has ended.
+        """
+        token = await self.queue.get()
+        if token is _END:
+            self.queue.put_nowait(_END)
+            return []
+        batch = [token]
+        while len(batch) < max_tokens and not self.queue.empty():
+            token = self.queue.get_nowait()
+            if token is _END:
+                self.queue.put_nowait(_END)
+                break
+            batch.append(token)
+        return batch
+
+
+class GenerationManager:
+    """
+    Keeps at most one generation running: starting a new one (new message,
+    model switch) cancels the previous one first.
+    """
+
+    def __init__(self, client, memory=None, queue_size=64):
+        self.client = client
+        self.memory = memory
+        self.queue_size = queue_size
+        self.current = None
+
+    def start(self, model, messages, sender="ai"):
+        self.cancel_current()
+        self.current = Generation(
+            self.client,
+            model,
+            messages,
+            memory=self.memory,
+            sender=sender,
+            queue_size=self.queue_size,
+        ).start()
+        return self.current
+
+    def cancel_current(self):
+        if self.current is not None:
+            self.current.cancel()
@@ -1,75 +1,481 @@
+import asyncio
 import sqlite3
+import threading
 from collections import deque
 import time
 
+from controller import metrics
+from controller.context import estimate_tokens
+from controller.db_worker import DatabaseWorker
+
+# Commit every message immediately (one fsync per message)
+DURABILITY_FULL = "full"
+# Group-commit messages by count or age (WAL, synchronous=NORMAL)
+DURABILITY_BATCHED = "batched"
+
+# Search ranks only the most recent matches, so very common terms stay fast
+SEARCH_RANK_WINDOW = 2000
+
+
 class MemoryController:
     """
     Manages the application's memory and chat history using a SQLite database.
     This class handles the storage and retrieval of conversation data.
+
+    All database work runs on a dedicated DatabaseWorker thread that owns the
+    connection, so the controller can be shared by the Kivy main loop,
+    executor threads and asyncio tasks. The *_async methods await the worker
+    without blocking the event loop.
+
+    With durability='batched', add_message returns without waiting for the
+    write; rows are committed in one transaction once `batch_size` messages
+    are pending or the oldest has waited `commit_interval` seconds, on
+    flush() and on close(). Reads always see earlier writes.
     """
-    def __init__(self, db_path='history.db', max_history=100):
+
+    def __init__(
+        self,
+        db_path="history.db",
+        max_history=100,
+        conversation_id="default",
+        durability=DURABILITY_FULL,
+        batch_size=32,
+        commit_interval=1.0,
+    ):
+        if durability not in (DURABILITY_FULL, DURABILITY_BATCHED):
+            raise ValueError(f"Unknown durability: {durability}")
         self.db_path = db_path
         self.max_history = max_history
-        self.connection = self.get_db_connection()
-        self.cursor = self.connection.cursor()
-        self.setup_database()
+        self.conversation_id = conversation_id
+        self.durability = durability
+        self.batch_size = batch_size if durability == DURABILITY_BATCHED else 1
+        self.commit_interval = commit_interval
+        # Guards the in-memory deque; the database itself is owned by the worker
+        self.lock = threading.Lock()
+        self.worker = DatabaseWorker(
+            self.get_db_connection,
+            batch_size=self.batch_size,
+            commit_interval=commit_interval,
+        )
+        self.fts_enabled = self.worker.call(self.setup_database)
         self.conversation_deque = self.load_recent_history()
 
     def get_db_connection(self):
         """Creates and returns a connection to the SQLite database."""
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        if self.durability == DURABILITY_BATCHED:
+            conn.execute("PRAGMA synchronous=NORMAL")
+        else:
+            conn.execute("PRAGMA synchronous=FULL")
         return conn
 
-    def setup_database(self):
+    def setup_database(self, conn):
         """
-        Creates the 'messages' table if it does not exist.
-        The table stores the timestamp, sender, and content of each message.
+        Creates the 'messages' table and its indexes if they do not exist.
+        Each message has an integer primary key, which doubles as the
+        pagination cursor, and belongs to a conversation.
+        Returns whether the full-text index is available.
         """
-        self.cursor.execute('''
+        legacy = self._has_legacy_schema(conn)
+        if legacy:
+            conn.execute("ALTER TABLE messages RENAME TO messages_legacy")
+        conn.execute(
+            """
             CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL DEFAULT 'default',
                 timestamp REAL,
                 sender TEXT,
-                content TEXT
+                content TEXT,
+                token_count INTEGER
+            )
+        """
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(messages)")]
+        if "token_count" not in columns:
+            # Counted lazily by context_rows_* the first time they are needed
+            conn.execute("ALTER TABLE messages ADD COLUMN token_count INTEGER")
+        if legacy:
+            conn.execute(
+                """
+                INSERT INTO messages (timestamp, sender, content)
+                SELECT timestamp, sender, content FROM messages_legacy
+                ORDER BY timestamp, rowid
+            """
             )
-        ''')
-        self.connection.commit()
+            conn.execute("DROP TABLE messages_legacy")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                start_id INTEGER NOT NULL,
+                end_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                token_count INTEGER NOT NULL,
+                created REAL NOT NULL
+            )
+        """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_summaries_conversation ON summaries (conversation_id, end_id)"
+        )
+        fts_enabled = self._setup_search_index(conn)
+        conn.commit()
+        return fts_enabled
+
+    def _setup_search_index(self, conn):
+        """
+        Creates the FTS5 index over message content plus the triggers that
+        keep it in sync with 'messages'. Databases that predate the index are
+        indexed once on open. Returns False if SQLite lacks FTS5.
+        """
+        existed = (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+            ).fetchone()
+            is not None
+        )
+        try:
+            conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content,
+                    content='messages',
+                    content_rowid='id',
+                    prefix='2 3',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """
+            )
+        except sqlite3.OperationalError:
+            return False
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content)
+                VALUES ('delete', old.id, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content)
+                VALUES ('delete', old.id, old.content);
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+            END;
+        """
+        )
+        if not existed:
+            conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+        return True
+
+    def rebuild_search_index(self):
+        """
+        Rebuilds the full-text index from the messages table.
+        Returns the number of indexed messages.
+        """
+        return self.worker.call(self._rebuild_search_index)
+
+    def _rebuild_search_index(self, conn):
+        if self.fts_enabled:
+            conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+            conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def _has_legacy_schema(self, conn):
+        """True if 'messages' exists in the original form without an id column."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(messages)")]
+        return bool(columns) and "id" not in columns
 
     def add_message(self, sender, content):
-        """Adds a new message to the database and the in-memory deque."""
+        """
+        Adds a new message to the database and the in-memory deque.
+        Returns a Future for the new message id; with full durability the
+        call waits until the message is committed.
+        """
+        future = self.submit_message(sender, content)
+        if self.durability == DURABILITY_FULL:
+            future.result()
+        return future
+
+    async def add_message_async(self, sender, content):
+        """Adds a message and returns its id once it is written."""
+        return await asyncio.wrap_future(self.submit_message(sender, content))
+
+    def submit_message(self, sender, content):
+        """Queues a message without waiting for the write; returns a Future for its id."""
         timestamp = time.time()
-        self.cursor.execute(
-            "INSERT INTO messages (timestamp, sender, content) VALUES (?, ?, ?)",
-            (timestamp, sender, content)
+        metrics.inc("memory.messages")
+        row = (
+            self.conversation_id,
+            timestamp,
+            sender,
+            content,
+            estimate_tokens(content),
         )
-        self.connection.commit()
+        future = self.worker.submit(self._insert_message, row, write=True)
+        future.add_done_callback(self._report_write_error)
         # Add to deque and maintain max size
-        self.conversation_deque.append((timestamp, sender, content))
-        if len(self.conversation_deque) > self.max_history:
-            self.conversation_deque.popleft()
+        with self.lock:
+            self.conversation_deque.append((timestamp, sender, content))
+        return future
+
+    def _insert_message(self, conn, row):
+        cur = conn.execute(
+            "INSERT INTO messages (conversation_id, timestamp, sender, content, token_count) "
+            "VALUES (?, ?, ?, ?, ?)",
+            row,
+        )
+        return cur.lastrowid
+
+    @staticmethod
+    def _report_write_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Memory write error: {future.exception()}")
 
     def load_recent_history(self):
         """
         Loads the most recent messages from the database into the deque.
         """
-        self.cursor.execute(
-            "SELECT timestamp, sender, content FROM messages ORDER BY timestamp DESC LIMIT ?",
-            (self.max_history,)
-        )
-        recent_history = self.cursor.fetchall()
+        recent_history = self.page_before(None, self.max_history)
         # The deque is populated in chronological order (oldest first)
-        return deque(reversed(recent_history), maxlen=self.max_history)
+        return deque(
+            ((ts, sender, content) for _, ts, sender, content in recent_history),
+            maxlen=self.max_history,
+        )
+
+    def page_before(self, cursor, n, conversation_id=None):
+        """
+        Returns up to `n` messages older than the message id `cursor`
+        (or the newest ones if `cursor` is None) as (id, timestamp, sender,
+        content) tuples in chronological order. The id of the first row is
+        the cursor for the next, older page. Served from the
+        (conversation_id, id) index, so no page ever scans the table.
+        """
+        conversation_id = conversation_id or self.conversation_id
+        return self.worker.call(self._page_before, cursor, n, conversation_id)
+
+    async def page_before_async(self, cursor, n, conversation_id=None):
+        conversation_id = conversation_id or self.conversation_id
+        return await self.worker.call_async(
+            self._page_before, cursor, n, conversation_id
+        )
+
+    def _page_before(self, conn, cursor, n, conversation_id):
+        # Runs on the worker connection, so uncommitted batched writes are visible
+        if cursor is None:
+            rows = conn.execute(
+                "SELECT id, timestamp, sender, content FROM messages "
+                "WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, n),
+            )
+        else:
+            rows = conn.execute(
+                "SELECT id, timestamp, sender, content FROM messages "
+                "WHERE conversation_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, cursor, n),
+            )
+        return list(reversed(rows.fetchall()))
+
+    def context_rows_before(self, cursor, n, conversation_id=None):
+        """
+        Like page_before, but returns (id, sender, content, token_count)
+        tuples for building model context.
+        """
+        conversation_id = conversation_id or self.conversation_id
+        return self.worker.call(self._context_rows, cursor, n, conversation_id, True)
+
+    def context_rows_after(self, cursor, conversation_id=None, until=None):
+        """
+        All (id, sender, content, token_count) tuples newer than message id
+        `cursor` (and older than `until`, if given).
+        """
+        conversation_id = conversation_id or self.conversation_id
+        return self.worker.call(
+            self._context_rows, cursor, None, conversation_id, False, until
+        )
+
+    def _context_rows(self, conn, cursor, n, conversation_id, before, until=None):
+        if before and cursor is None:
+            rows = conn.execute(
+                "SELECT id, sender, content, token_count FROM messages "
+                "WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, n),
+            ).fetchall()
+            rows.reverse()
+        elif before:
+            rows = conn.execute(
+                "SELECT id, sender, content, token_count FROM messages "
+                "WHERE conversation_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, cursor, n),
+            ).fetchall()
+            rows.reverse()
+        elif until is None:
+            rows = conn.execute(
+                "SELECT id, sender, content, token_count FROM messages "
+                "WHERE conversation_id = ? AND id > ? ORDER BY id",
+                (conversation_id, cursor or 0),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, sender, content, token_count FROM messages "
+                "WHERE conversation_id = ? AND id > ? AND id < ? ORDER BY id",
+                (conversation_id, cursor or 0, until),
+            ).fetchall()
+        missing = [
+            (estimate_tokens(content), id_)
+            for id_, _, content, count in rows
+            if count is None
+        ]
+        if missing:
+            # Runs inline on the worker, counted as a batched write
+            self.worker.submit(self._store_token_counts, missing, write=True)
+            counts = {id_: count for count, id_ in missing}
+            rows = [
+                (id_, sender, content, count if count is not None else counts[id_])
+                for id_, sender, content, count in rows
+            ]
+        return rows
+
+    def _store_token_counts(self, conn, counts):
+        conn.executemany("UPDATE messages SET token_count = ? WHERE id = ?", counts)
+
+    def add_summary(self, start_id, end_id, content, conversation_id=None):
+        """
+        Stores a summary covering messages start_id..end_id and returns it as
+        an (id, start_id, end_id, content, token_count) tuple.
+        """
+        conversation_id = conversation_id or self.conversation_id
+        row = (
+            conversation_id,
+            start_id,
+            end_id,
+            content,
+            estimate_tokens(content),
+            time.time(),
+        )
+        return self.worker.call(self._insert_summary, row, write=True)
+
+    def _insert_summary(self, conn, row):
+        cur = conn.execute(
+            "INSERT INTO summaries (conversation_id, start_id, end_id, content, token_count, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            row,
+        )
+        return (cur.lastrowid,) + row[1:5]
+
+    def latest_summary(self, conversation_id=None):
+        """The summary reaching furthest into the conversation, or None."""
+        conversation_id = conversation_id or self.conversation_id
+        return self.worker.call(
+            lambda conn: conn.execute(
+                "SELECT id, start_id, end_id, content, token_count FROM summaries "
+                "WHERE conversation_id = ? ORDER BY end_id DESC, id DESC LIMIT 1",
+                (conversation_id,),
+            ).fetchone()
+        )
+
+    def search(self, query, limit=20, offset=0, conversation_id=None):
+        """
+        Full-text search over all messages (or one conversation).
+        Returns (id, conversation_id, timestamp, sender, snippet) tuples,
+        best match first; matches in the snippet are wrapped in [b]...[/b].
+        Ranking covers the SEARCH_RANK_WINDOW most recent matches.
+        """
+        return self.worker.call(self._search, query, limit, offset, conversation_id)
+
+    async def search_async(self, query, limit=20, offset=0, conversation_id=None):
+        return await self.worker.call_async(
+            self._search, query, limit, offset, conversation_id
+        )
+
+    def _search(self, conn, query, limit, offset, conversation_id):
+        terms = query.split()
+        if not terms:
+            return []
+        if not self.fts_enabled:
+            return self._search_like(conn, terms, limit, offset, conversation_id)
+        # Quote every term so user input is never parsed as FTS syntax;
+        # the last term matches as a prefix while typing.
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms) + "*"
+        window = max(SEARCH_RANK_WINDOW, offset + limit)
+        # The window is taken within the conversation, otherwise newer hits
+        # elsewhere could push all of its matches out of the window.
+        scope, scope_params = "", []
+        if conversation_id:
+            scope = " AND m.conversation_id = ?"
+            scope_params = [conversation_id]
+        oldest = conn.execute(
+            "SELECT messages_fts.rowid FROM messages_fts "
+            "JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ?"
+            + scope
+            + " ORDER BY messages_fts.rowid DESC LIMIT 1 OFFSET ?",
+            [match] + scope_params + [window - 1],
+        ).fetchone()
+        sql = (
+            "SELECT m.id, m.conversation_id, m.timestamp, m.sender, "
+            "snippet(messages_fts, 0, '[b]', '[/b]', '…', 12) "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ? AND messages_fts.rowid >= ?" + scope
+        )
+        params = [match, oldest[0] if oldest else 0] + scope_params
+        sql += " ORDER BY rank LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        return conn.execute(sql, params).fetchall()
+
+    def _search_like(self, conn, terms, limit, offset, conversation_id):
+        """Fallback for SQLite builds without FTS5 (scans the table)."""
+        sql = "SELECT id, conversation_id, timestamp, sender, content FROM messages WHERE "
+        sql += " AND ".join("content LIKE ?" for _ in terms)
+        params = [f"%{term}%" for term in terms]
+        if conversation_id:
+            sql += " AND conversation_id = ?"
+            params.append(conversation_id)
+        sql += " ORDER BY id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        return conn.execute(sql, params).fetchall()
 
     def get_full_history(self):
         """
         Returns all messages currently stored in the in-memory deque.
         """
-        return list(self.conversation_deque)
+        with self.lock:
+            return list(self.conversation_deque)
+
+    def flush(self):
+        """
+        Commits all pending batched writes in a single transaction.
+        Returns the number of messages committed.
+        """
+        return self.worker.flush()
+
+    async def flush_async(self):
+        return await self.worker.flush_async()
 
     def close(self):
-        """Closes the database connection."""
-        self.connection.close()
+        """Flushes pending writes and closes the database connection."""
+        self.worker.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild-search":
+        # python -m controller.memory rebuild-search [history.db]
+        memory = MemoryController(sys.argv[2] if len(sys.argv) > 2 else "history.db")
+        print(f"Indexed {memory.rebuild_search_index()} messages")
+        memory.close()
+        sys.exit(0)
 
-if __name__ == '__main__':
     # Example usage:
     memory = MemoryController()
     memory.add_message("user", "Hallo, wie geht es dir?")
@@ -0,0 +1,186 @@
+"""
+Process-wide counters and histograms for performance data.
+
+Disabled by default; every recording function then returns after a single
+boolean check, so instrumented hot paths cost next to nothing. Enable with
+`enable()` or the environment variable AIDROID_METRICS=1.
+
+    from controller import metrics
+    metrics.inc("cache.misses")
+    metrics.observe("stream.ttft", 0.42)
+    with metrics.timer("db.commit"):
+        conn.commit()
+    metrics.snapshot()  # JSON-ready dict
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Recent samples kept per histogram for percentiles
+RESERVOIR_SIZE = 512
+
+# Derived ratios in snapshots: name -> (hit counters, miss counters)
+RATIOS = {
+    "cache.hit_ratio": (("cache.memory_hits", "cache.disk_hits"), ("cache.misses",)),
+}
+
+_enabled = os.environ.get("AIDROID_METRICS", "") not in ("", "0")
+
+
+class Histogram:
+    """Count, sum, min and max over all samples; percentiles over recent ones."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.recent.append(value)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(value)
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {name: h.summary() for name, h in self.histograms.items()}
+        ratios = {}
+        for name, (hits, misses) in RATIOS.items():
+            hit = sum(counters.get(c, 0) for c in hits)
+            total = hit + sum(counters.get(c, 0) for c in misses)
+            if total:
+                ratios[name] = hit / total
+        return {
+            "enabled": _enabled,
+            "uptime": time.time() - self.started,
+            "counters": counters,
+            "histograms": histograms,
+            "ratios": ratios,
+        }
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+registry = Registry()
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def inc(name, n=1):
+    if _enabled:
+        registry.inc(name, n)
+
+
+def observe(name, value):
+    """Adds a sample (seconds for timings) to histogram `name`."""
+    if _enabled:
+        registry.observe(name, value)
+
+
+def timer(name):
+    """Context manager recording the elapsed seconds in histogram `name`."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def reset():
+    registry.reset()
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def dump(path):
+    """Writes the current snapshot as JSON (atomically) and returns it."""
+    data = snapshot()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return data
@@ -1,43 +1,233 @@
 import httpx
 import os
 import asyncio
+import time
+
+from controller import metrics
+from controller.resilience import TransientError, check_status, get_shared_resilience
+from controller.sse import ChatStreamDecoder
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY") or ""  # alternativ in .env laden
 OPENROUTER_URL = "https://openrouter.ai/api/v1"
 
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Timeouts pro Request: `read` gilt beim Streaming pro Chunk, nicht für die ganze Antwort
+DEFAULT_TIMEOUT = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=5.0)
+MODELS_TIMEOUT = httpx.Timeout(15.0, connect=10.0)
+
+
+# Liefert den API-Key, z.B. lambda: config.get_secret("openrouter_api_key")
+_api_key_provider = None
+
+
+def set_api_key_provider(provider):
+    """Quelle für den API-Key setzen; gefragt wird erst beim ersten Request."""
+    global _api_key_provider
+    _api_key_provider = provider
+
+
+def resolve_api_key():
+    """API-Key aus dem Provider (verschlüsselte Einstellungen), sonst OPENROUTER_API_KEY."""
+    if _api_key_provider is not None:
+        try:
+            key = _api_key_provider()
+        except Exception as e:
+            # z.B. SecretsUnavailable oder ein anderer Schlüsselspeicher
+            print(f"API key error: {e}")
+            key = None
+        if key:
+            return key
+    return os.getenv("OPENROUTER_API_KEY") or ""
+
+
 class OpenRouterClient:
-    def __init__(self):
-        self.headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "HTTP-Referer": "aidroid.app",
-            "X-Title": "aiDroid – S25"
-        }
+    """
+    OpenRouter-Client mit einem gemeinsamen, langlebigen Connection-Pool.
+    Verbindungen bleiben zwischen Chat-Turns offen; schließen via `aclose()`
+    oder `async with OpenRouterClient() as client:`.
+    429/5xx und Verbindungsabbrüche werden über `resilience`
+    (controller.resilience) wiederholt, gedrosselt und ggf. abgewiesen.
+    """
+
+    def __init__(
+        self,
+        max_connections=10,
+        max_keepalive=5,
+        keepalive_expiry=60.0,
+        http2=True,
+        timeout=DEFAULT_TIMEOUT,
+        resilience=None,
+        base_url=OPENROUTER_URL,
+        api_key=None,
+        transport=None,
+    ):
+        self.api_key = api_key
+        # Header-Werte müssen ASCII sein (httpx lehnt z.B. "–" ab)
+        self.headers = {"HTTP-Referer": "aidroid.app", "X-Title": "aiDroid - S25"}
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = timeout
+        self.base_url = base_url
+        self.resilience = resilience or get_shared_resilience()
+        # Eigener Transport, z.B. httpx.MockTransport in Tests
+        self.transport = transport
+        self.last_stream_info = None
+        self._client = None
+
+    @property
+    def client(self):
+        """Gemeinsamer AsyncClient, wird beim ersten Request erzeugt."""
+        if self._client is None or self._client.is_closed:
+            api_key = self.api_key or resolve_api_key()
+            headers = dict(self.headers)
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                limits=self.limits,
+                http2=self.http2,
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+        return self._client
+
+    async def set_api_key(self, api_key):
+        """Neuen Key verwenden; der Pool wird dafür neu aufgebaut."""
+        self.api_key = api_key
+        await self.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _get(self, path, headers=None, timeout=None):
+        try:
+            res = await self.client.get(path, headers=headers, timeout=timeout)
+        except httpx.TransportError as e:
+            raise TransientError(str(e) or type(e).__name__) from e
+        check_status(res.status_code, res.headers)
+        return res
+
+    async def get(self, path, headers=None, timeout=None):
+        """GET mit Retries; liefert die httpx-Response."""
+        return await self.resilience.call(self._get, path, headers, timeout)
 
     async def fetch_models(self):
-        async with httpx.AsyncClient() as client:
-            res = await client.get(f"{OPENROUTER_URL}/models", headers=self.headers)
-            return res.json().get("data", [])
+        res = await self.get("/models", timeout=MODELS_TIMEOUT)
+        res.raise_for_status()
+        return res.json().get("data", [])
+
+    async def fetch_models_conditional(self, etag=None, last_modified=None):
+        """
+        Bedingter Abruf von `/models`.
+        Liefert (status, models, etag, last_modified); bei 304 ist models leer.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        res = await self.get("/models", headers=headers, timeout=MODELS_TIMEOUT)
+        if res.status_code == 304:
+            return 304, [], etag, last_modified
+        res.raise_for_status()
+        return (
+            res.status_code,
+            res.json().get("data", []),
+            res.headers.get("ETag"),
+            res.headers.get("Last-Modified"),
+        )
 
-    async def stream(self, model, messages):
-        url = f"{OPENROUTER_URL}/chat/completions"
-        headers = self.headers | {"Content-Type": "application/json"}
+    async def stream(self, model, messages, timeout=None, info=None):
+        """
+        Streamt die Antwort-Tokens. Metadaten (finish_reason, usage, Fehler,
+        fehlerhafte Frames) landen in `info` bzw. `self.last_stream_info`.
+        Scheitert der Request vor dem ersten Token, wird er wiederholt.
+        """
+        decoder = ChatStreamDecoder(info)
+        self.last_stream_info = decoder.info
+        metrics.inc("stream.requests")
+        started = time.perf_counter()
+        first = None
+        count = 0
+        try:
+            async for token in self.resilience.stream(
+                lambda: self._stream_once(model, messages, timeout, decoder.info)
+            ):
+                if first is None:
+                    first = time.perf_counter()
+                    metrics.observe("stream.ttft", first - started)
+                count += 1
+                yield token
+        except Exception:
+            metrics.inc("stream.errors")
+            raise
+        if first is not None and count > 1:
+            duration = time.perf_counter() - first
+            if duration > 0:
+                metrics.observe("stream.tokens_per_second", count / duration)
+
+    async def _stream_once(self, model, messages, timeout, info):
+        decoder = ChatStreamDecoder(info)
+        headers = {"Content-Type": "application/json"}
         payload = {
             "model": model,
             "messages": messages,
             "stream": True,
-            "temperature": 0.7
+            "temperature": 0.7,
         }
-        async with httpx.AsyncClient(timeout=None) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as response:
-                buffer = ""
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        chunk = line.removeprefix("data: ")
-                        if chunk == "[DONE]":
-                            break
-                        try:
-                            token = httpx.Response._json_decoder.decode(chunk)["choices"][0]["delta"].get("content", "")
-                            if token:
-                                yield token
-                        except Exception:
-                            continue
+        try:
+            async with self.client.stream(
+                "POST",
+                "/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=timeout or self.timeout,
+            ) as response:
+                check_status(response.status_code, response.headers)
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    for token in decoder.feed(chunk):
+                        yield token
+                    if decoder.info.done:
+                        return
+                for token in decoder.flush():
+                    yield token
+        except httpx.TransportError as e:
+            raise TransientError(str(e) or type(e).__name__) from e
+
+    async def complete(self, model, messages, timeout=None):
+        """Komplette Antwort als String (z.B. für Zusammenfassungen)."""
+        return "".join(
+            [token async for token in self.stream(model, messages, timeout=timeout)]
+        )
+
+
+_shared_client = None
+
+
+def get_shared_client():
+    """Prozessweit gemeinsamer OpenRouterClient (ein Pool für Modelle und Chat)."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = OpenRouterClient()
+    return _shared_client
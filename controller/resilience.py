@@ -0,0 +1,287 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Statuses worth retrying: rate limits, timeouts and server-side failures
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class TransientError(Exception):
+    """A failure that may succeed on retry (429, 5xx, dropped connection)."""
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the upstream while the breaker is open."""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Upstream unavailable, retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now or time.time()))
+
+
+def check_status(status, headers=None):
+    """Raises TransientError for retryable statuses, honoring Retry-After."""
+    if status in RETRYABLE_STATUS:
+        retry_after = parse_retry_after((headers or {}).get("Retry-After"))
+        raise TransientError(f"HTTP {status}", status=status, retry_after=retry_after)
+
+
+class TokenBucket:
+    """
+    Client-side rate limit: `rate` requests per second with bursts of up to
+    `capacity`. Callers reserve a token and wait until it is due, so waiters
+    are served in order and the bucket never refills beyond its capacity.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns how many seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and then
+    rejects calls for `reset_timeout` seconds. Afterwards a single probe is
+    let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._clock = clock
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return BREAKER_CLOSED
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return BREAKER_HALF_OPEN
+        return BREAKER_OPEN
+
+    def check(self):
+        """Raises CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            state = self.state
+            if state == BREAKER_CLOSED:
+                return
+            if state == BREAKER_HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            retry_in = max(0.0, self.opened_at + self.reset_timeout - self._clock())
+            raise CircuitOpenError(retry_in)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+            self._probing = False
+
+    def release(self):
+        """Ends a call that neither succeeded nor failed transiently (4xx, cancel,
+        bug): frees the half-open probe slot without changing the state."""
+        with self._lock:
+            self._probing = False
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter; Retry-After takes precedence."""
+
+    def __init__(
+        self, max_attempts=4, base_delay=0.5, max_delay=20.0, max_retry_after=60.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (starting at 0)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class Resilience:
+    """
+    Retry, rate limiting and circuit breaking around calls to one upstream.
+    Operations signal retryable failures by raising TransientError (see
+    `check_status`); any other exception passes straight through.
+
+    `stream()` only retries while nothing has been yielded yet: once the
+    first token reached the caller, a dropped stream is reported instead of
+    silently starting the answer over.
+    """
+
+    def __init__(self, rate=None, burst=None, retry=None, breaker=None):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "rejected": 0,
+            "throttled": 0.0,
+        }
+
+    def _admit(self):
+        try:
+            self.breaker.check()
+        except CircuitOpenError:
+            self.stats["rejected"] += 1
+            raise
+        self.stats["calls"] += 1
+        return self.bucket.reserve() if self.bucket else 0.0
+
+    def _backoff(self, attempt, error):
+        """Records a transient failure; returns the delay or re-raises when out of attempts."""
+        self.breaker.record_failure()
+        if attempt + 1 >= self.retry.max_attempts:
+            self.stats["failures"] += 1
+            raise error
+        self.stats["retries"] += 1
+        return self.retry.delay(attempt, error.retry_after)
+
+    async def call(self, fn, *args):
+        """Awaits `fn(*args)` with retries; returns its result."""
+        attempt = 0
+        while True:
+            wait = self._admit()
+            try:
+                if wait:
+                    self.stats["throttled"] += wait
+                    await asyncio.sleep(wait)
+                result = await fn(*args)
+            except TransientError as e:
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def call_sync(self, fn, *args):
+        """Blocking variant of `call()` for executor threads."""
+        attempt = 0
+        while True:
+            wait = self._admit()
+            try:
+                if wait:
+                    self.stats["throttled"] += wait
+                    time.sleep(wait)
+                result = fn(*args)
+            except TransientError as e:
+                time.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def stream(self, open_stream):
+        """Iterates `open_stream()`, reopening it if it fails before the first item."""
+        attempt = 0
+        while True:
+            wait = self._admit()
+            started = False
+            inner = None
+            try:
+                if wait:
+                    self.stats["throttled"] += wait
+                    await asyncio.sleep(wait)
+                inner = open_stream()
+                async for item in inner:
+                    if not started:
+                        started = True
+                        self.breaker.record_success()
+                    yield item
+            except TransientError as e:
+                if started:
+                    self.stats["failures"] += 1
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled, closed early or a non-retryable error
+                self.breaker.release()
+                raise
+            finally:
+                # Closes the HTTP response now, not when the generator is collected
+                if inner is not None:
+                    await inner.aclose()
+            if not started:
+                self.breaker.record_success()
+            return
+
+
+_shared_resilience = None
+
+
+def get_shared_resilience():
+    """Process-wide Resilience for OpenRouter, shared by all clients."""
+    global _shared_resilience
+    if _shared_resilience is None:
+        _shared_resilience = Resilience(rate=5, burst=10)
+    return _shared_resilience
@@ -0,0 +1,246 @@
+import abc
+import base64
+import hashlib
+import os
+from functools import lru_cache
+
+# PBKDF2 rounds; derivation runs once per process thanks to derive_key's cache
+KDF_ITERATIONS = 200_000
+SALT_BYTES = 16
+MASTER_SECRET_BYTES = 32
+
+
+class SecretsUnavailable(RuntimeError):
+    """Secrets need the optional `cryptography` package."""
+
+
+class Keystore(abc.ABC):
+    """
+    Holds the master secret that secret config values are encrypted with,
+    outside of config.json.
+    """
+
+    @abc.abstractmethod
+    def load(self):
+        """Returns the stored master secret, or None if there is none yet."""
+
+    @abc.abstractmethod
+    def store(self, secret):
+        """Persists a new master secret."""
+
+    def master_secret(self):
+        secret = self.load()
+        if secret is None:
+            secret = os.urandom(MASTER_SECRET_BYTES)
+            self.store(secret)
+        return secret
+
+
+def _write_private(path, data):
+    """Atomically writes `data` to a file only the app user can read."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class FileKeystore(Keystore):
+    """
+    Master secret in a plain local file, protected only by its permissions.
+    Next to config.json it adds little, so default_keystore() only falls
+    back to it when no platform keystore is available; tests use it too.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                return base64.b64decode(f.read())
+        except FileNotFoundError:
+            return None
+
+    def store(self, secret):
+        _write_private(self.path, base64.b64encode(secret))
+
+
+class KeyringKeystore(Keystore):
+    """Master secret in the desktop keyring (optional `keyring` package)."""
+
+    def __init__(self, service="aiDroid", username="config-master-key"):
+        self.service = service
+        self.username = username
+
+    @staticmethod
+    def available():
+        """True if keyring is installed and has a real backend (not the fail one)."""
+        try:
+            import keyring
+
+            return keyring.get_keyring().priority > 0
+        except Exception:
+            return False
+
+    def load(self):
+        import keyring
+
+        value = keyring.get_password(self.service, self.username)
+        return base64.b64decode(value) if value else None
+
+    def store(self, secret):
+        import keyring
+
+        keyring.set_password(
+            self.service, self.username, base64.b64encode(secret).decode("ascii")
+        )
+
+
+class AndroidKeystore(Keystore):
+    """
+    Master secret wrapped with an AES-GCM key that is generated inside the
+    Android Keystore and never leaves it (hardware-backed where the device
+    supports it). Only the wrapped secret is written to `path`.
+    """
+
+    PROVIDER = "AndroidKeyStore"
+    IV_BYTES = 12
+
+    def __init__(self, path, alias="aiDroid-config-master-key"):
+        self.path = path
+        self.alias = alias
+
+    def _key(self):
+        from jnius import autoclass
+
+        KeyStore = autoclass("java.security.KeyStore")
+        store = KeyStore.getInstance(self.PROVIDER)
+        store.load(None)
+        if not store.containsAlias(self.alias):
+            KeyProperties = autoclass("android.security.keystore.KeyProperties")
+            Builder = autoclass("android.security.keystore.KeyGenParameterSpec$Builder")
+            KeyGenerator = autoclass("javax.crypto.KeyGenerator")
+            spec = (
+                Builder(
+                    self.alias,
+                    KeyProperties.PURPOSE_ENCRYPT | KeyProperties.PURPOSE_DECRYPT,
+                )
+                .setBlockModes([KeyProperties.BLOCK_MODE_GCM])
+                .setEncryptionPaddings([KeyProperties.ENCRYPTION_PADDING_NONE])
+                .build()
+            )
+            generator = KeyGenerator.getInstance(
+                KeyProperties.KEY_ALGORITHM_AES, self.PROVIDER
+            )
+            generator.init(spec)
+            generator.generateKey()
+        return store.getKey(self.alias, None)
+
+    def load(self):
+        from jnius import autoclass
+
+        try:
+            with open(self.path, "rb") as f:
+                data = base64.b64decode(f.read())
+        except FileNotFoundError:
+            return None
+        Cipher = autoclass("javax.crypto.Cipher")
+        GCMParameterSpec = autoclass("javax.crypto.spec.GCMParameterSpec")
+        cipher = Cipher.getInstance("AES/GCM/NoPadding")
+        cipher.init(
+            Cipher.DECRYPT_MODE,
+            self._key(),
+            GCMParameterSpec(128, data[: self.IV_BYTES]),
+        )
+        return bytes(cipher.doFinal(data[self.IV_BYTES :]))
+
+    def store(self, secret):
+        from jnius import autoclass
+
+        Cipher = autoclass("javax.crypto.Cipher")
+        cipher = Cipher.getInstance("AES/GCM/NoPadding")
+        cipher.init(Cipher.ENCRYPT_MODE, self._key())
+        wrapped = bytes(cipher.doFinal(secret))
+        _write_private(self.path, base64.b64encode(bytes(cipher.getIV()) + wrapped))
+
+
+def default_keystore(config_dir, android=False):
+    """
+    Android Keystore on Android, the desktop keyring if one is usable, and
+    a key file in `config_dir` only as the last resort. A key file left by
+    an earlier fallback is moved into the platform keystore.
+    """
+    key_file = FileKeystore(os.path.join(config_dir, ".master.key"))
+    if android:
+        platform = AndroidKeystore(os.path.join(config_dir, ".master.key.wrapped"))
+    elif KeyringKeystore.available():
+        platform = KeyringKeystore()
+    else:
+        return key_file
+    secret = key_file.load()
+    if secret is not None:
+        existing = platform.load()
+        if existing is None:
+            platform.store(secret)
+        elif existing != secret:
+            # Secrets in config.json were encrypted with the file's key
+            return key_file
+        os.remove(key_file.path)
+    return platform
+
+
+def new_salt():
+    return base64.b64encode(os.urandom(SALT_BYTES)).decode("ascii")
+
+
+@lru_cache(maxsize=8)
+def derive_key(secret, salt, iterations=KDF_ITERATIONS):
+    """Fernet key (urlsafe base64) from the master secret; cached per process."""
+    raw = hashlib.pbkdf2_hmac(
+        "sha256", secret, base64.b64decode(salt), iterations, dklen=32
+    )
+    return base64.urlsafe_b64encode(raw)
+
+
+def _fernet():
+    # Imported on first use: cryptography is optional and slow to import
+    try:
+        from cryptography.fernet import Fernet, InvalidToken
+    except ImportError as e:
+        raise SecretsUnavailable(
+            "Verschlüsselte Einstellungen benötigen 'cryptography'"
+        ) from e
+    return Fernet, InvalidToken
+
+
+class SecretCipher:
+    """Encrypts and decrypts single secret values with Fernet (AES + HMAC)."""
+
+    def __init__(self, keystore, salt=None, iterations=KDF_ITERATIONS):
+        self.keystore = keystore
+        self.salt = salt or new_salt()
+        self.iterations = iterations
+        self._fernet = None
+        self._invalid_token = None
+
+    def _cipher(self):
+        if self._fernet is None:
+            Fernet, InvalidToken = _fernet()
+            key = derive_key(self.keystore.master_secret(), self.salt, self.iterations)
+            self._fernet = Fernet(key)
+            self._invalid_token = InvalidToken
+        return self._fernet
+
+    def encrypt(self, value):
+        return self._cipher().encrypt(value.encode("utf-8")).decode("ascii")
+
+    def decrypt(self, token):
+        cipher = self._cipher()
+        try:
+            return cipher.decrypt(token.encode("ascii")).decode("utf-8")
+        except self._invalid_token as e:
+            raise ValueError(
+                "Secret kann nicht entschlüsselt werden (falscher Schlüssel?)"
+            ) from e
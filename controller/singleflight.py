@@ -0,0 +1,38 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key: while a call for `key`
+    is in flight, further calls await the same future instead of starting
+    their own. Once it completes the key is released, so later calls run
+    again (and usually hit the response cache).
+
+    `coalesced` counts the calls that were served by another call's result.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, factory):
+        """Awaits `factory()` once per key among concurrent callers."""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: one waiter being cancelled must not cancel the others
+            return await asyncio.shield(future)
+
+        self.calls += 1
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _f: self._release(key, future))
+        return await asyncio.shield(future)
+
+    def _release(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
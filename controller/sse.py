@@ -0,0 +1,222 @@
+import json
+
+
+class SSEEvent:
+    """A single dispatched server-sent event."""
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(self, data, event="message", id=None, retry=None):
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, id={self.id!r}, data={self.data!r})"
+
+
+class SSEParser:
+    """
+    Incremental text/event-stream parser working on raw byte chunks.
+    Chunks may split lines (and multi-byte characters) anywhere; complete
+    events are returned from `feed()` as soon as their blank line arrives.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._data = []
+        self._event = None
+        self._retry = None
+        self.last_event_id = None
+        self.comments = 0
+
+    def feed(self, chunk):
+        """Consumes a byte chunk and returns the events it completed."""
+        buffer = self._buffer + chunk
+        if b"\r" in buffer:
+            # A trailing CR may be the first half of a CRLF split across chunks
+            carry = buffer.endswith(b"\r")
+            if carry:
+                buffer = buffer[:-1]
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            if carry:
+                buffer += b"\r"
+
+        events = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            event = self._process_line(buffer[start:end])
+            if event is not None:
+                events.append(event)
+            start = end + 1
+        self._buffer = buffer[start:]
+        return events
+
+    def flush(self):
+        """Dispatches a final event left unterminated at end of stream."""
+        events = []
+        if self._buffer:
+            line, self._buffer = self._buffer.rstrip(b"\r"), b""
+            self._process_line(line)
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line):
+        if not line:
+            return self._dispatch()
+        if line[0] == 0x3A:  # ":" - comment / keep-alive
+            self.comments += 1
+            return None
+
+        field, sep, value = line.partition(b":")
+        if sep and value[:1] == b" ":
+            value = value[1:]
+        if field == b"data":
+            self._data.append(value.decode("utf-8", "replace"))
+        elif field == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif field == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self._retry = int(value)
+        return None
+
+    def _dispatch(self):
+        if not self._data:
+            self._event = None
+            return None
+        event = SSEEvent(
+            "\n".join(self._data),
+            event=self._event or "message",
+            id=self.last_event_id,
+            retry=self._retry,
+        )
+        self._data = []
+        self._event = None
+        self._retry = None
+        return event
+
+
+def fast_delta(data):
+    """
+    Pulls the delta content out of a plain completion chunk without parsing
+    the JSON. Returns None whenever the frame needs a full parse: escaped
+    content, finish_reason/usage/error metadata, or an unexpected layout.
+    """
+    if '"finish_reason":null' not in data or '"usage"' in data or '"error"' in data:
+        return None
+    delta = data.find('"delta":{')
+    if delta < 0:
+        return None
+    key = data.find('"content":"', delta)
+    if key < 0 or "}" in data[delta:key]:
+        return None
+    start = key + 11
+    end = data.find('"', start)
+    if end < 0:
+        return None
+    content = data[start:end]
+    if "\\" in content:
+        return None
+    return content
+
+
+class StreamInfo:
+    """Metadata collected while decoding one completion stream."""
+
+    MAX_MALFORMED = 20
+
+    def __init__(self):
+        self.finish_reason = None
+        self.usage = None
+        self.error = None
+        self.model = None
+        self.malformed = []
+        self.malformed_count = 0
+        self.events = 0
+        self.tokens = 0
+        self.done = False
+        # True when the answer was replayed from the response cache
+        self.cached = False
+
+    def record_malformed(self, data):
+        self.malformed_count += 1
+        if len(self.malformed) < self.MAX_MALFORMED:
+            self.malformed.append(data)
+
+
+class ChatStreamDecoder:
+    """
+    Turns raw OpenRouter/OpenAI streaming bytes into content tokens.
+    Plain delta frames take the `fast_delta` path; everything else is fully
+    parsed so finish_reason, usage and error frames end up in `info`.
+    """
+
+    def __init__(self, info=None):
+        self.parser = SSEParser()
+        self.info = info if info is not None else StreamInfo()
+
+    def feed(self, chunk):
+        """Returns the content tokens contained in `chunk`."""
+        return self._decode(self.parser.feed(chunk))
+
+    def flush(self):
+        return self._decode(self.parser.flush())
+
+    def _decode(self, events):
+        tokens = []
+        info = self.info
+        for event in events:
+            if info.done:
+                break
+            info.events += 1
+            data = event.data
+            if data == "[DONE]":
+                info.done = True
+                break
+
+            token = fast_delta(data)
+            if token is None:
+                token = self._parse(data)
+            if token:
+                info.tokens += 1
+                tokens.append(token)
+        return tokens
+
+    def _parse(self, data):
+        info = self.info
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            info.record_malformed(data)
+            return None
+        if not isinstance(chunk, dict):
+            info.record_malformed(data)
+            return None
+
+        if "error" in chunk:
+            info.error = chunk["error"]
+        if chunk.get("usage"):
+            info.usage = chunk["usage"]
+        if chunk.get("model"):
+            info.model = chunk["model"]
+
+        choices = chunk.get("choices") or []
+        if not choices:
+            return None
+        try:
+            choice = choices[0]
+            if choice.get("finish_reason"):
+                info.finish_reason = choice["finish_reason"]
+            return (choice.get("delta") or {}).get("content") or None
+        except AttributeError:
+            info.record_malformed(data)
+            return None
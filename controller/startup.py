@@ -0,0 +1,232 @@
+import os
+import sys
+import threading
+import time
+
+# Cold start target: process start until the first frame is on screen
+STARTUP_BUDGET = 1.5
+
+
+class _ImportNode:
+    """One module in the import tree, with its own and cumulative time."""
+
+    def __init__(self, name):
+        self.name = name
+        self.cumulative = 0.0
+        self.children = []
+
+    @property
+    def self_time(self):
+        return self.cumulative - sum(child.cumulative for child in self.children)
+
+
+class _TimedLoader:
+    """Loader proxy that times `exec_module`, i.e. running the module body."""
+
+    def __init__(self, loader, timer, name):
+        self._loader = loader
+        self._timer = timer
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer._exit()
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportTimer:
+    """
+    Records which modules are imported while installed, nested by who
+    imported whom, like `python -X importtime` but from inside the app so
+    it also works in a packaged build where interpreter flags are not
+    available. Only meant for `--profile-startup`: it wraps loaders, which
+    costs a little on every import.
+    """
+
+    def __init__(self):
+        self.root = _ImportNode("<startup>")
+        self._stack = [self.root]
+        self._starts = []
+        self._local = threading.local()
+        self._thread = threading.get_ident()
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        # Imports on other threads (warmup) would interleave the tree
+        if threading.get_ident() != self._thread or getattr(self._local, "busy", False):
+            return None
+        self._local.busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.busy = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, name)
+        return spec
+
+    def _enter(self, name):
+        node = _ImportNode(name)
+        self._stack[-1].children.append(node)
+        self._stack.append(node)
+        self._starts.append(time.perf_counter())
+
+    def _exit(self):
+        node = self._stack.pop()
+        node.cumulative = time.perf_counter() - self._starts.pop()
+
+    @property
+    def total(self):
+        return sum(child.cumulative for child in self.root.children)
+
+    def tree(self, min_time=0.001):
+        """Lines of (depth, name, self, cumulative), slowest subtrees first."""
+        lines = []
+
+        def walk(node, depth):
+            for child in sorted(node.children, key=lambda n: -n.cumulative):
+                if child.cumulative < min_time:
+                    continue
+                lines.append((depth, child.name, child.self_time, child.cumulative))
+                walk(child, depth + 1)
+
+        walk(self.root, 0)
+        return lines
+
+
+def process_start_time():
+    """
+    The `time.perf_counter()` value at which this process started, read from
+    /proc (Linux, Android). Returns None where that is not available.
+    """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Field 22 (starttime), counted after the parenthesised command name
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        started = ticks / os.sysconf("SC_CLK_TCK")
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    if age < 0:
+        return None
+    return time.perf_counter() - age
+
+
+class StartupProfiler:
+    """
+    Marks startup phases relative to process start and renders the
+    `--profile-startup` report: import tree, phases, time to first frame
+    and whether it stayed within `budget`. Where the process start time is
+    unknown, the profiler's own creation is the baseline instead, which
+    leaves out interpreter and Kivy bootstrap time.
+    """
+
+    def __init__(self, budget=STARTUP_BUDGET, imports=True, started=None):
+        self.budget = budget
+        if started is None:
+            started = process_start_time()
+        self.started = time.perf_counter() if started is None else started
+        self.marks = []
+        self.imports = ImportTimer().install() if imports else None
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.started))
+
+    def elapsed(self, name):
+        for mark, elapsed in self.marks:
+            if mark == name:
+                return elapsed
+        return None
+
+    @property
+    def first_frame(self):
+        return self.elapsed("first_frame")
+
+    def within_budget(self):
+        return self.first_frame is not None and self.first_frame <= self.budget
+
+    def report(self, min_import_time=0.002):
+        lines = []
+        if self.imports is not None:
+            lines.append(f"Import-Zeit gesamt: {self.imports.total * 1000:.1f} ms")
+            lines.append(f"{'selbst':>9} | {'kumuliert':>9} | Modul")
+            for depth, name, own, cumulative in self.imports.tree(min_import_time):
+                lines.append(
+                    f"{own * 1000:7.1f}ms | {cumulative * 1000:7.1f}ms | "
+                    f"{'  ' * depth}{name}"
+                )
+            lines.append("")
+        for name, elapsed in self.marks:
+            lines.append(f"{elapsed * 1000:9.1f} ms  {name}")
+        if self.first_frame is None:
+            lines.append("Erster Frame: nicht erreicht")
+        else:
+            verdict = "OK" if self.within_budget() else "ÜBER BUDGET"
+            lines.append(
+                f"Erster Frame nach {self.first_frame * 1000:.0f} ms "
+                f"(Budget {self.budget * 1000:.0f} ms): {verdict}"
+            )
+        return "\n".join(lines)
+
+
+class Warmup:
+    """
+    Runs deferred initialization (heavy imports, network client, database)
+    on a background thread once the first frame is up, so it no longer
+    delays cold start but is ready before the user's first message.
+    """
+
+    def __init__(self, tasks=None, profiler=None):
+        self.tasks = list(tasks or [])
+        self.profiler = profiler
+        self.durations = {}
+        self.errors = {}
+        self.done = threading.Event()
+        self._thread = None
+
+    def add(self, name, fn):
+        self.tasks.append((name, fn))
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="aiDroid-warmup", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _run(self):
+        for name, fn in self.tasks:
+            started = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                # Warmup is an optimization; the real call will retry and report
+                self.errors[name] = e
+            self.durations[name] = time.perf_counter() - started
+            if self.profiler is not None:
+                self.profiler.mark(f"warmup: {name}")
+        self.done.set()
@@ -0,0 +1,155 @@
+import asyncio
+import re
+
+from controller.cache_key import CacheKeyBuilder
+from controller.sse import StreamInfo
+
+# Words with their trailing whitespace, so replayed chunks join back exactly
+_CHUNKS = re.compile(r"\S+\s*|\s+")
+
+
+async def replay(text, info, batch=8):
+    """
+    Yields a cached answer as a synthetic token stream, handing control back
+    to the event loop every `batch` chunks so the UI keeps rendering.
+    """
+    info.cached = True
+    for i, chunk in enumerate(_CHUNKS.findall(text), 1):
+        info.tokens += 1
+        yield chunk
+        if i % batch == 0:
+            await asyncio.sleep(0)
+    info.finish_reason = info.finish_reason or "stop"
+    info.done = True
+
+
+class CachingClient:
+    """
+    Drop-in wrapper for OpenRouterClient that makes streamed answers reusable.
+
+    On a cache miss the stream is teed: tokens pass through unchanged while
+    being collected, and once the stream completes cleanly (`[DONE]` after
+    finish_reason "stop") the full answer is written to the response cache
+    (and `memory`, if given) in a single background job. On a hit the cached answer is replayed through
+    `replay()`, so Generation and ChatArea run the same code path.
+
+    Keys come from the same CacheKeyBuilder scheme as AsyncNetworkHandler:
+    model, temperature, the earlier messages as context, and the prompt.
+    Pass `memory` here instead of to Generation to record answers only once.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache,
+        memory_cache=None,
+        key_builder=None,
+        memory=None,
+        sender="ai",
+        temperature=0.7,
+        executor=None,
+    ):
+        self.client = client
+        self.cache = cache
+        self.memory_cache = memory_cache
+        self.key_builder = key_builder or CacheKeyBuilder()
+        self.memory = memory
+        self.sender = sender
+        self.temperature = temperature
+        self.executor = executor
+        self.stats = {"hits": 0, "misses": 0, "stored": 0}
+        self._writes = set()
+
+    def __getattr__(self, name):
+        # fetch_models, aclose etc. go straight to the wrapped client
+        return getattr(self.client, name)
+
+    def _params(self, model, messages):
+        return {
+            "model": model,
+            "temperature": self.temperature,
+            "context": messages[:-1],
+        }
+
+    def _lookup(self, keys):
+        for index, key in enumerate(keys):
+            entry = self.cache.get_entry(key)
+            if entry is not None:
+                return index, key, entry
+        return None
+
+    async def _cached(self, prompt, params):
+        keys = self.key_builder.candidates(prompt, **params)
+        if self.memory_cache is not None:
+            for index, key in enumerate(keys):
+                text = self.memory_cache.get(key)
+                if text is not None:
+                    self.key_builder.record(index)
+                    return text
+        loop = asyncio.get_running_loop()
+        found = await loop.run_in_executor(self.executor, self._lookup, keys)
+        if found is None:
+            self.key_builder.record(None)
+            return None
+        index, key, (text, created) = found
+        self.key_builder.record(index)
+        if self.memory_cache is not None:
+            self.memory_cache.put(key, text, created=created)
+        return text
+
+    async def stream(self, model, messages, timeout=None, info=None):
+        prompt = messages[-1].get("content", "") if messages else ""
+        params = self._params(model, messages)
+        text = await self._cached(prompt, params)
+        if text is not None:
+            self.stats["hits"] += 1
+            if self.memory is not None:
+                self.memory.submit_message(self.sender, text)
+            async for chunk in replay(text, info if info is not None else StreamInfo()):
+                yield chunk
+            return
+
+        self.stats["misses"] += 1
+        parts = []
+        # The inner client fills `info`; keep our own handle on it
+        info = info if info is not None else StreamInfo()
+        kwargs = (
+            {"info": info} if timeout is None else {"info": info, "timeout": timeout}
+        )
+        async for token in self.client.stream(model, messages, **kwargs):
+            parts.append(token)
+            yield token
+        # Only complete answers: errors, cancellation and early exits never get
+        # here, and a truncated stream ("length", EOF without [DONE]) is skipped
+        if parts and info.error is None and info.done and info.finish_reason == "stop":
+            self._store(prompt, "".join(parts), params)
+
+    async def complete(self, model, messages, timeout=None):
+        return "".join(
+            [token async for token in self.stream(model, messages, timeout=timeout)]
+        )
+
+    def _store(self, prompt, text, params):
+        key = self.key_builder.build(prompt, **params)
+        if self.memory_cache is not None:
+            self.memory_cache.put(key, text)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, self._write, prompt, key, text, params
+        )
+        self._writes.add(future)
+        future.add_done_callback(self._writes.discard)
+
+    def _write(self, prompt, key, text, params):
+        """Background job: response cache and history in one go."""
+        device = "samsung_s25" if "s25" in prompt.lower() else "generic"
+        self.cache.put(key, text, device=device)
+        self.key_builder.remember(prompt, key, **params)
+        if self.memory is not None:
+            self.memory.submit_message(self.sender, text)
+        self.stats["stored"] += 1
+
+    async def drain(self):
+        """Waits for pending background writes (before shutdown, in tests)."""
+        if self._writes:
+            await asyncio.gather(*list(self._writes), return_exceptions=True)
@@ -1,18 +1,79 @@
+import sys
+
+# Vor dem Kivy-Import auswerten: Kivy bricht bei unbekannten Argumenten ab
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+if PROFILE_STARTUP:
+    sys.argv.remove("--profile-startup")
+
+from controller.startup import StartupProfiler, Warmup
+
+profiler = StartupProfiler(imports=PROFILE_STARTUP)
+
 import kivy
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.lang import Builder
+from kivy.clock import Clock
 
-kivy.require('2.2.1') # replace with your current Kivy version
+kivy.require("2.2.1")  # replace with your current Kivy version
+
+profiler.mark("kivy")
 
-Builder.load_file('kv/main.kv')
 
 class MainWidget(BoxLayout):
     pass
 
+
+def _warm_network():
+    from controller.network import (
+        get_shared_client,
+        resolve_api_key,
+        set_api_key_provider,
+    )
+    from utils import SecureConfigManager
+
+    config = SecureConfigManager()
+    set_api_key_provider(lambda: config.get_secret("openrouter_api_key"))
+    # Schlüsselableitung (PBKDF2) und Entschlüsselung hier im Warmup-Thread,
+    # damit der erste Request sie nicht im Event-Loop bezahlt
+    resolve_api_key()
+    get_shared_client()
+
+
 class aiDroidApp(App):
     def build(self):
+        # kv erst laden, wenn die App existiert
+        Builder.load_file("kv/main.kv")
+        profiler.mark("kv")
         return MainWidget()
 
-if __name__ == '__main__':
-    aiDroidApp().run()
+    def on_start(self):
+        profiler.mark("on_start")
+        from kivy.core.window import Window
+
+        Window.bind(on_flip=self._on_first_frame)
+
+    def _on_first_frame(self, window, *args):
+        window.unbind(on_flip=self._on_first_frame)
+        profiler.mark("first_frame")
+        if profiler.imports is not None:
+            profiler.imports.uninstall()
+        # Netzwerk und schwere Importe erst nach dem ersten Frame
+        self.warmup = Warmup([("network", _warm_network)], profiler=profiler).start()
+        if PROFILE_STARTUP:
+            Clock.schedule_interval(self._finish_profile, 0.1)
+
+    def _finish_profile(self, *args):
+        if not self.warmup.done.is_set():
+            return
+        print(profiler.report())
+        self.startup_ok = profiler.within_budget()
+        self.stop()
+        return False
+
+
+if __name__ == "__main__":
+    app = aiDroidApp()
+    app.run()
+    if PROFILE_STARTUP and not getattr(app, "startup_ok", False):
+        sys.exit(1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests für die Benchmark-Suite (Vergleich und Fake-Server, keine Messungen)"""
+
+import pytest
+import json
+import os
+import sys
+import urllib.request
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import FakeOpenRouter
+from benchmarks.suite import HIGHER, LOWER, Results, compare
+from controller.sse import ChatStreamDecoder
+
+
+def result(value, better=LOWER):
+    return {"value": value, "unit": "ms", "better": better}
+
+
+def test_compare_flags_regressions_in_both_directions():
+    """Test Latenz höher oder Durchsatz niedriger als Baseline ist Regression"""
+    baseline = {
+        "results": {
+            "latency": result(10),
+            "rate": result(1000, HIGHER),
+            "stable": result(5),
+        }
+    }
+    current = {
+        "results": {
+            "latency": result(13),
+            "rate": result(700, HIGHER),
+            "stable": result(5.5),
+            "new": result(1),
+        }
+    }
+    regressions = compare(current, baseline, threshold=0.2)
+    assert [(name, round(change, 2)) for name, _, _, change in regressions] == [
+        ("latency", 0.3),
+        ("rate", 0.3),
+    ]
+    assert compare(current, baseline, threshold=0.5) == []
+
+
+def test_noise_floor_and_best_of_repeats():
+    """Test kleine absolute Änderungen sind Rauschen, Wiederholungen zählen den besten Wert"""
+    baseline = {"results": {"page": result(0.1), "slow": result(10)}}
+    current = {"results": {"page": result(0.25), "slow": result(13)}}
+    assert [name for name, *_ in compare(current, baseline)] == ["slow"]
+    assert [name for name, *_ in compare(current, baseline, noise_floor={})] == [
+        "page",
+        "slow",
+    ]
+
+    results = Results()
+    for value in (3.0, 1.0, 2.0):
+        results.add("latency", value, "ms")
+    for value in (100, 300, 200):
+        results.add("rate", value, "tok/s", HIGHER)
+    assert results.metrics["latency"]["value"] == 1.0
+    assert results.metrics["rate"]["value"] == 300
+
+
+def test_fake_server_streams_recorded_completion():
+    """Test Fake-Server liefert Modelle und einen dekodierbaren SSE-Stream"""
+    with FakeOpenRouter(tokens=50) as fake:
+        with urllib.request.urlopen(fake.url + "/models") as res:
+            assert len(json.loads(res.read())["data"]) == 300
+        request = urllib.request.Request(
+            fake.url + "/chat/completions", data=b"{}", method="POST"
+        )
+        with urllib.request.urlopen(request) as res:
+            decoder = ChatStreamDecoder()
+            tokens = decoder.feed(res.read()) + decoder.flush()
+        assert fake.requests == 2
+    assert len(tokens) == 50
+    assert decoder.info.finish_reason == "stop"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
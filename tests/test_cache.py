@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Tests für controller/cache.py"""
+
+import pytest
+import os
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.cache import MemoryLRU, ResponseCache
+
+
+def test_put_and_get():
+    """Test Response speichern und abrufen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "responses.db"))
+        cache.put("key", "Antwort")
+
+        assert cache.get("key") == "Antwort"
+        assert cache.get("missing") is None
+        assert cache.info()["entries"] == 1
+        cache.close()
+
+
+def test_max_age_expires_entries():
+    """Test abgelaufene Einträge werden nicht zurückgegeben"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "responses.db"), max_age=0)
+        cache.put("key", "Antwort")
+
+        assert cache.get("key") is None
+        assert cache.info()["entries"] == 0
+        cache.close()
+
+
+def test_lru_eviction_respects_size_cap():
+    """Test LRU-Verdrängung bei Überschreitung der Größe"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "responses.db"), max_bytes=300)
+        cache.put("a", "x" * 100)
+        cache.put("b", "x" * 100)
+        # "a" als zuletzt benutzt markieren
+        cache.connection.execute(
+            "UPDATE responses SET accessed = accessed + 10 WHERE key = 'a'"
+        )
+        cache.put("c", "x" * 100)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.info()["total_size"] <= 300
+        cache.close()
+
+
+def test_stats_survive_reopen():
+    """Test Statistiken nach erneutem Öffnen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "responses.db")
+        cache = ResponseCache(path)
+        cache.put("a", "eins")
+        cache.put("a", "zwei")
+        cache.put("b", "drei")
+        cache.close()
+
+        cache = ResponseCache(path)
+        assert cache.info()["entries"] == 2
+        assert cache.get("a") == "zwei"
+        assert cache.clear() == 2
+        assert cache.info()["total_size"] == 0
+        cache.close()
+
+
+def test_eviction_with_shared_file_terminates():
+    """Test Verdrängung endet, wenn ein zweiter Cache dieselbe Datei geleert hat"""
+    import threading
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "responses.db")
+        cache = ResponseCache(path, max_bytes=300)
+        other = ResponseCache(path, max_bytes=300)
+        cache.put("a", "x" * 100)
+        cache.put("b", "x" * 100)
+        # Die Zähler von `cache` stimmen danach nicht mehr mit der Tabelle überein
+        other.clear()
+
+        worker = threading.Thread(target=cache.put, args=("c", "x" * 150), daemon=True)
+        worker.start()
+        worker.join(5)
+        assert not worker.is_alive()
+        assert cache.get("c") is not None
+        assert cache.info()["entries"] == 1
+        other.close()
+        cache.close()
+
+
+def test_memory_lru_budgets():
+    """Test In-Memory LRU mit Eintrags- und Byte-Limit"""
+    lru = MemoryLRU(max_entries=2, max_bytes=1024)
+    lru.put("a", "eins")
+    lru.put("b", "zwei")
+    assert lru.get("a") == "eins"
+    lru.put("c", "drei")
+
+    # "b" war am längsten unbenutzt
+    assert lru.get("b") is None
+    assert len(lru) == 2
+
+    lru.put("d", "x" * 1020)
+    assert lru.total_bytes <= 1024
+    assert lru.get("d") is not None
+
+    lru.clear()
+    assert len(lru) == 0
+    assert lru.total_bytes == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
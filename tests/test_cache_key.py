@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Tests für controller/cache_key.py"""
+
+import pytest
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.cache_key import (
+    CacheKeyBuilder,
+    context_fingerprint,
+    cosine,
+    ngram_embedding,
+)
+
+
+def test_normalization_merges_trivial_variants():
+    """Test Groß-/Kleinschreibung und Leerzeichen ergeben denselben Schlüssel"""
+    builder = CacheKeyBuilder()
+    assert builder.build("Hallo Welt") == builder.build("  hallo   welt \n")
+    assert builder.build("Hallo!") != builder.build("hallo")
+
+    strict = CacheKeyBuilder(normalize=("case", "whitespace", "punctuation"))
+    assert strict.build("Hallo!") == strict.build("hallo")
+
+    raw = CacheKeyBuilder(normalize=())
+    assert raw.build("Hallo") != raw.build("hallo")
+
+    with pytest.raises(ValueError):
+        CacheKeyBuilder(normalize=("stemming",))
+
+
+def test_key_depends_on_model_temperature_and_context():
+    """Test Antworten anderer Modelle/Parameter/Kontexte treffen nicht"""
+    builder = CacheKeyBuilder()
+    base = builder.build("Hallo", model="a/x", temperature=0.7)
+    assert base == builder.build("Hallo", model="a/x", temperature=0.70001)
+    assert base != builder.build("Hallo", model="b/y", temperature=0.7)
+    assert base != builder.build("Hallo", model="a/x", temperature=0.2)
+
+    context = [{"role": "user", "content": "Wer bist du?"}]
+    assert base != builder.build("Hallo", model="a/x", temperature=0.7, context=context)
+    assert context_fingerprint(context) != context_fingerprint(
+        [{"role": "assistant", "content": "Wer bist du?"}]
+    )
+
+
+def test_similarity_lookup_within_scope():
+    """Test ähnliche Prompts finden den vorhandenen Schlüssel, nur im gleichen Scope"""
+    builder = CacheKeyBuilder(similarity_threshold=0.8)
+    key = builder.build("Wie wird das Wetter morgen in Berlin?", model="a/x")
+    builder.remember("Wie wird das Wetter morgen in Berlin?", key, model="a/x")
+
+    candidates = builder.candidates("Wie wird das Wetter morgen in Berlin", model="a/x")
+    assert candidates[1] == key
+    assert (
+        builder.candidates("Wie wird das Wetter morgen in Berlin", model="b/y")[1:]
+        == []
+    )
+    assert builder.candidates("Erzähl mir einen Witz", model="a/x")[1:] == []
+
+    builder.record(1)
+    builder.record(0)
+    builder.record(None)
+    builder.record(None)
+    report = builder.report()
+    assert report["similar_hits"] == 1
+    assert report["hit_rate"] == 0.5
+    assert report["similar_entries"] == 1
+
+
+def test_ngram_embedding_is_normalized():
+    """Test Embedding hat Länge 1 und ist deterministisch"""
+    a = ngram_embedding("hallo welt")
+    assert abs(cosine(a, a) - 1.0) < 1e-9
+    assert a == ngram_embedding("hallo welt")
+    assert cosine(a, ngram_embedding("tschüss mond")) < 0.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
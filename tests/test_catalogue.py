@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Tests für controller/catalogue.py"""
+
+import pytest
+import asyncio
+import os
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.catalogue import ModelCatalogue
+
+MODELS = [
+    {
+        "id": "openai/gpt-4o-mini",
+        "name": "GPT-4o mini",
+        "context_length": 128000,
+        "pricing": {"prompt": "0.00000015", "completion": "0.0000006"},
+    },
+    {
+        "id": "anthropic/claude-3.5-sonnet",
+        "name": "Claude 3.5 Sonnet",
+        "context_length": 200000,
+        "pricing": {"prompt": "0.000003", "completion": "0.000015"},
+    },
+    {
+        "id": "openai/gpt-4o",
+        "name": "GPT-4o",
+        "context_length": 128000,
+        "pricing": {"prompt": "0.0000025", "completion": "0.00001"},
+    },
+]
+
+
+class FakeClient:
+    """Simuliert /models mit ETag-Revalidierung"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def fetch_models_conditional(self, etag=None, last_modified=None):
+        self.requests.append((etag, last_modified))
+        if etag == '"v1"':
+            return 304, [], etag, last_modified
+        return 200, MODELS, '"v1"', "Tue, 01 Oct 2024 10:00:00 GMT"
+
+
+def test_refresh_persist_and_revalidate():
+    """Test Katalog wird gespeichert, sofort geladen und per 304 revalidiert"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "models.json")
+        client = FakeClient()
+        catalogue = ModelCatalogue(path)
+        assert catalogue.ids == []
+
+        assert asyncio.run(catalogue.refresh(client)) is True
+        assert catalogue.ids == [
+            "anthropic/claude-3.5-sonnet",
+            "openai/gpt-4o",
+            "openai/gpt-4o-mini",
+        ]
+
+        # Neustart: sofort aus der Datei, kein Request solange frisch
+        catalogue = ModelCatalogue(path)
+        assert len(catalogue.ids) == 3
+        assert asyncio.run(catalogue.refresh(client)) is False
+        assert len(client.requests) == 1
+
+        # Nach Ablauf der TTL: bedingter Request, 304 behält die Liste
+        catalogue.ttl = 0
+        assert asyncio.run(catalogue.refresh(client)) is False
+        assert client.requests[-1] == ('"v1"', "Tue, 01 Oct 2024 10:00:00 GMT")
+        assert len(catalogue.ids) == 3
+
+
+def test_indexes():
+    """Test Index nach Anbieter, Kontextlänge und Preis"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        catalogue = ModelCatalogue(os.path.join(temp_dir, "models.json"))
+        catalogue.set_models([ModelCatalogue.normalize(m) for m in MODELS])
+
+        assert [m["id"] for m in catalogue.by_provider["openai"]] == [
+            "openai/gpt-4o",
+            "openai/gpt-4o-mini",
+        ]
+        assert catalogue.by_context_length[0]["id"] == "anthropic/claude-3.5-sonnet"
+        assert catalogue.by_price[0]["id"] == "openai/gpt-4o-mini"
+        assert [m["id"] for m in catalogue.filter(min_context=150000)] == [
+            "anthropic/claude-3.5-sonnet"
+        ]
+        assert [
+            m["id"]
+            for m in catalogue.filter(provider="openai", max_prompt_price=0.000001)
+        ] == ["openai/gpt-4o-mini"]
+        assert catalogue.context_length("openai/gpt-4o") == 128000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
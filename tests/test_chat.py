@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Tests für components/chat.py"""
+
+import pytest
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+
+def test_rows_bind_to_views():
+    """Test Datenzeilen lassen sich auf recycelte Views übertragen"""
+    from components.chat import ChatArea, ChatBubble, ParallelRow
+
+    chat = ChatArea(size=(400, 800))
+    chat.add_bubble("ai", "Hallo")
+    bubble = ChatBubble()
+    bubble.refresh_view_attrs(chat, 0, chat.data[0])
+    assert bubble.text == "Hallo"
+    assert bubble.msg_key == chat.data[0]["msg_key"]
+
+    row = ParallelRow()
+    row.refresh_view_attrs(
+        chat,
+        1,
+        {
+            "viewclass": "ParallelRow",
+            "role": "parallel",
+            "text": "",
+            "msg_key": 1,
+            "columns": [{"model": "a/m", "text": "x", "stats": ""}],
+            "height": 50,
+        },
+    )
+    assert len(row.children) == 1
+
+
+def test_recycled_view_takes_new_row():
+    """Test eine recycelte Sprechblase übernimmt Text, Rolle und msg_key der neuen Zeile"""
+    from components.chat import ChatArea, ChatBubble
+
+    chat = ChatArea(size=(400, 800))
+    chat.add_bubble("user", "Frage")
+    chat.add_bubble("ai", "Antwort")
+    bubble = ChatBubble()
+    bubble.refresh_view_attrs(chat, 0, chat.data[0])
+    bubble.refresh_view_attrs(chat, 1, chat.data[1])
+    assert (bubble.text, bubble.role) == ("Antwort", "ai")
+    assert bubble.msg_key == chat.data[1]["msg_key"]
+    assert bubble.halign == "left"
+
+
+def test_width_change_measures_visible_rows_first(monkeypatch):
+    """Test Breitenänderung misst sichtbare Zeilen sofort, den Rest in Batches, Höhen je msg_key gecacht"""
+    import components.chat as chat_module
+    from components.chat import ChatArea, REMEASURE_BATCH
+
+    chat = ChatArea(size=(400, 800))
+    for i in range(300):
+        chat.add_bubble("user" if i % 2 else "ai", f"Nachricht {i} " * (1 + i % 7))
+    chat.scroll_y = 0
+
+    measured = []
+    measure = chat_module.measure_height
+
+    def spy(text, width):
+        measured.append(text)
+        return measure(text, width)
+
+    monkeypatch.setattr(chat_module, "measure_height", spy)
+    chat.width = 900
+    # Nur die Zeilen am unteren Ende (Ansicht + Rand), nicht der ganze Verlauf
+    assert 0 < len(measured) < 60
+    assert chat.data[-1]["height"] == measure(chat.data[-1]["text"], 900)
+    assert chat._remeasure_keys
+
+    while chat._remeasure_keys:
+        before = len(measured)
+        chat._remeasure_batch()
+        assert len(measured) - before <= REMEASURE_BATCH
+    assert len(measured) == 300
+    assert all(item["height"] == measure(item["text"], 900) for item in chat.data)
+
+    # Zurück zur alten Breite: alles aus dem Höhen-Cache, nichts neu gemessen
+    measured.clear()
+    chat.width = 400
+    while chat._remeasure_keys:
+        chat._remeasure_batch()
+    assert measured == []
+    assert chat.data[0]["height"] == measure(chat.data[0]["text"], 400)
+
+
+def test_follow_waits_for_frame_before_next_batch():
+    """Test follow() holt den nächsten Batch erst nach dem Frame-Flush"""
+    import asyncio
+    from components.chat import ChatArea
+
+    class FakeGeneration:
+        def __init__(self, batches):
+            self.batches = list(batches)
+            self.pulled = 0
+
+        async def next_batch(self):
+            self.pulled += 1
+            return self.batches.pop(0) if self.batches else []
+
+        def cancel(self):
+            self.batches = []
+
+    async def run():
+        chat = ChatArea(size=(400, 800))
+        generation = FakeGeneration([["Hal", "lo"], [" Welt"]])
+        chat.follow(generation)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert generation.pulled == 1
+        assert chat._pending == ["Hal", "lo"]
+
+        chat._flush_tokens()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert generation.pulled == 2
+        chat._flush_tokens()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert chat.data[-1]["text"] == "Hallo Welt"
+        assert chat._generation is None
+
+    asyncio.run(run())
+
+
+def test_split_stream_text_prefers_paragraphs():
+    """Test Aufteilen am Absatz, sonst am Leerzeichen, sonst hart"""
+    from components.chat import split_stream_text
+
+    assert split_stream_text("kurz", limit=10) == ([], "kurz")
+    assert split_stream_text("eins zwei\n\ndrei vier", limit=12) == (
+        ["eins zwei"],
+        "drei vier",
+    )
+    assert split_stream_text("aaaa bbbb cccc", limit=10) == (["aaaa bbbb"], "cccc")
+    assert split_stream_text("x" * 25, limit=10) == (["x" * 10, "x" * 10], "x" * 5)
+
+
+def test_streaming_measures_only_the_tail(monkeypatch):
+    """Test lange Antwort: fertige Abschnitte werden feste Zeilen, gemessen wird nur der Rest"""
+    import components.chat as chat_module
+    from components.chat import ChatArea, STREAM_CHUNK_CHARS
+
+    measured = []
+    measure = chat_module.measure_height
+
+    def spy(text, width):
+        measured.append(len(text))
+        return measure(text, width)
+
+    chat = ChatArea(size=(400, 800))
+    chat.add_bubble("user", "Frage")
+    monkeypatch.setattr(chat_module, "measure_height", spy)
+    tokens = [f" Token{i}" for i in range(1000)]
+    for start in range(0, len(tokens), 8):
+        for token in tokens[start : start + 8]:
+            chat.stream_token("ai", token)
+        chat._flush_tokens()
+
+    rows = [item for item in chat.data if item["role"] == "ai"]
+    assert len(rows) > 1
+    assert max(measured) <= STREAM_CHUNK_CHARS
+    # Fertige Zeilen werden nicht erneut gemessen
+    assert len(measured) < len(tokens) / 8 + len(rows) + 1
+    assert " ".join(item["text"] for item in rows) == "".join(tokens)
+    assert len({item["msg_key"] for item in chat.data}) == len(chat.data)
+
+
+def test_load_older_continues_before_oldest_shown_row():
+    """Test Nachladen beginnt vor der ältesten angezeigten Nachricht, ohne Duplikate"""
+    import asyncio
+    import tempfile
+    from components.chat import ChatArea
+    from controller.memory import MemoryController
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        for i in range(10):
+            memory.add_message("user", f"Nachricht {i}")
+
+        async def run():
+            chat = ChatArea(size=(400, 800), history_source=memory.page_before_async)
+            chat.page_size = 4
+            # Neueste Seite wie beim Start anzeigen, ohne set_history_cursor
+            for msg_id, _, sender, content in memory.page_before(None, 3):
+                chat.add_bubble(sender, content, msg_id=msg_id)
+
+            task = chat.load_older()
+            # Läuft schon eine Seite, startet kein zweiter Abruf
+            assert chat.load_older() is None
+            await task
+            await chat.load_older()
+            await chat.load_older()
+            assert chat.load_older() is None
+            return [item["text"] for item in chat.data]
+
+        texts = asyncio.run(run())
+        memory.close()
+    assert texts == [f"Nachricht {i}" for i in range(10)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tests für controller/compaction.py"""
+
+import pytest
+import os
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.compaction import Compactor, extractive_summarizer
+from controller.context import ContextBuilder, SUMMARY_PREFIX
+from controller.memory import MemoryController
+
+
+class StubSummarizer:
+    """Lokaler Ersatz für die API: zählt Aufrufe und Nachrichten"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, previous, messages):
+        self.calls.append((previous, messages))
+        covered = int(previous.split()[0]) if previous else 0
+        return f"{covered + len(messages)} Nachrichten"
+
+
+def _builder(memory, summarizer):
+    compactor = Compactor(memory, summarizer, target_ratio=0.5)
+    # 104 Tokens je Nachricht, Budget 536 -> höchstens 5 Nachrichten
+    return ContextBuilder(
+        memory, context_lengths={"m": 600}, reserve=64, compactor=compactor
+    )
+
+
+def test_compaction_replaces_old_messages_with_summary():
+    """Test alte Nachrichten werden zusammengefasst statt verworfen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        summarizer = StubSummarizer()
+        builder = _builder(memory, summarizer)
+
+        for i in range(4):
+            memory.add_message("user", f"{i:02d} " + "x" * 397)
+        assert len(builder.build("m")) == 4
+        assert summarizer.calls == []
+
+        sizes = []
+        for i in range(4, 40):
+            memory.add_message("user", f"{i:02d} " + "x" * 397)
+            messages = builder.build("m")
+            sizes.append(len(messages))
+            assert builder.window_tokens("m") <= 536
+
+        # Nutzlast bleibt konstant klein, Zusammenfassung deckt den Rest ab
+        assert max(sizes) <= 6
+        assert messages[0]["role"] == "system"
+        assert messages[0]["content"].startswith(SUMMARY_PREFIX)
+        covered = int(messages[0]["content"][len(SUMMARY_PREFIX) :].split()[0])
+        assert covered + len(messages) - 1 == 40
+        # Nicht bei jedem Turn zusammenfassen
+        assert len(summarizer.calls) < 36 / 2
+        memory.close()
+
+
+def test_summary_is_persisted_and_reused():
+    """Test gespeicherte Zusammenfassung wird nach Neustart wiederverwendet"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        memory = MemoryController(db_path)
+        for i in range(20):
+            memory.add_message("user", f"{i:02d} " + "x" * 397)
+        summarizer = StubSummarizer()
+        first = _builder(memory, summarizer).build("m")
+        summary = memory.latest_summary()
+        assert summary[1] == 1
+        memory.close()
+
+        memory = MemoryController(db_path)
+        summarizer = StubSummarizer()
+        again = _builder(memory, summarizer).build("m")
+        assert summarizer.calls == []
+        assert again == first
+        memory.close()
+
+
+def test_extractive_summarizer():
+    """Test lokaler Summarizer ohne API"""
+    text = extractive_summarizer(
+        "Vorher.",
+        [
+            {"role": "user", "content": "Welche Kamera hat das S25. Und sonst?"},
+            {"role": "assistant", "content": "50 MP Hauptkamera\nmit OIS"},
+        ],
+    )
+    assert (
+        text == "Vorher.\nuser: Welche Kamera hat das S25\nassistant: 50 MP Hauptkamera"
+    )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Tests für controller/context.py"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.context import ContextBuilder, estimate_tokens
+from controller.memory import DURABILITY_BATCHED, MemoryController
+
+
+def test_estimate_tokens():
+    """Test lokale Token-Schätzung"""
+    assert estimate_tokens("") == 4
+    assert estimate_tokens("a" * 400) == 104
+    assert estimate_tokens("ü" * 30) > estimate_tokens("u" * 30)
+
+
+def test_build_respects_budget():
+    """Test Kontext bleibt im Token-Budget, neueste Nachrichten zuerst"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        for i in range(20):
+            memory.add_message("user" if i % 2 == 0 else "ai", f"{i:02d} " + "x" * 397)
+
+        # 104 Tokens je Nachricht -> 5 Nachrichten passen in 600 - 64
+        builder = ContextBuilder(memory, context_lengths={"m": 600}, reserve=64)
+        messages = builder.build("m")
+        assert [m["content"][:2] for m in messages] == ["15", "16", "17", "18", "19"]
+        assert messages[-1]["role"] == "assistant"
+        assert builder.window_tokens("m") <= 536
+
+        with_system = builder.build("m", system_prompt="Sei kurz.")
+        assert with_system[0] == {"role": "system", "content": "Sei kurz."}
+        memory.close()
+
+
+def test_build_reads_only_new_messages():
+    """Test inkrementeller Aufbau liest nur neue Nachrichten"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        for i in range(10):
+            memory.add_message("user", f"{i:02d} " + "x" * 397)
+        builder = ContextBuilder(memory, context_lengths={"m": 600}, reserve=64)
+        builder.build("m")
+
+        calls = []
+        original = memory.context_rows_after
+        memory.context_rows_before = None  # darf nicht mehr benutzt werden
+        memory.context_rows_after = lambda *a: calls.append(a) or original(*a)
+
+        memory.add_message("ai", "neu")
+        messages = builder.build("m")
+        assert messages[-1]["content"] == "neu"
+        assert len(calls) == 1
+        assert builder.window_tokens("m") <= 536
+        memory.close()
+
+
+def test_token_counts_backfilled_for_old_rows():
+    """Test fehlende Token-Zahlen werden nachgetragen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE messages (timestamp REAL, sender TEXT, content TEXT)"
+        )
+        conn.execute("INSERT INTO messages VALUES (1.0, 'user', 'Hallo')")
+        conn.commit()
+        conn.close()
+
+        memory = MemoryController(db_path)
+        assert memory.context_rows_before(None, 10)[0][3] == estimate_tokens("Hallo")
+        stored = memory.worker.call(
+            lambda c: c.execute("SELECT token_count FROM messages").fetchone()[0]
+        )
+        assert stored == estimate_tokens("Hallo")
+        memory.close()
+
+
+def test_token_count_backfill_is_a_batched_write():
+    """Test Nachtragen läuft über das Group-Commit des Workers statt eigenem Commit"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE messages (timestamp REAL, sender TEXT, content TEXT)"
+        )
+        conn.execute("INSERT INTO messages VALUES (1.0, 'user', 'Hallo')")
+        conn.commit()
+        conn.close()
+
+        memory = MemoryController(
+            db_path, durability=DURABILITY_BATCHED, batch_size=3, commit_interval=60
+        )
+        memory.context_rows_before(None, 10)
+        assert memory.worker.uncommitted == 1
+        assert memory.flush() == 1
+        memory.close()
+
+        memory = MemoryController(db_path)
+        stored = memory.worker.call(
+            lambda c: c.execute("SELECT token_count FROM messages").fetchone()[0]
+        )
+        assert stored == estimate_tokens("Hallo")
+        memory.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Tests für controller/fanout.py"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.fanout import FanOut, FANOUT_FIRST
+
+
+class FakeModelsClient:
+    """Streamt je Modell eine feste Antwort mit eigener Verzögerung pro Token"""
+
+    def __init__(self, delays, tokens=5, fail=()):
+        self.delays = delays
+        self.tokens = tokens
+        self.fail = fail
+        self.active = 0
+        self.max_active = 0
+        self.closed = []
+
+    async def stream(self, model, messages, info=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            for i in range(self.tokens):
+                await asyncio.sleep(self.delays[model])
+                if model in self.fail:
+                    raise RuntimeError("boom")
+                yield f"{model}{i} "
+        finally:
+            self.active -= 1
+            self.closed.append(model)
+
+
+def test_all_mode_collects_every_answer_within_limit():
+    """Test alle Antworten werden gesammelt, höchstens `concurrency` gleichzeitig"""
+    client = FakeModelsClient({"a": 0.001, "b": 0.002, "c": 0.001, "d": 0.003})
+
+    async def run():
+        fanout = FanOut(client, ["a", "b", "c", "d"], [], concurrency=2).start()
+        return await fanout.wait(), fanout
+
+    results, fanout = asyncio.run(run())
+    assert client.max_active == 2
+    assert results["b"] == "b0 b1 b2 b3 b4 "
+    assert set(results) == {"a", "b", "c", "d"}
+    report = fanout.report()
+    assert all(r["status"] == "done" for r in report.values())
+    assert report["a"]["tokens"] == 5
+    assert report["d"]["ttft"] > 0
+    assert report["d"]["latency"] >= report["d"]["ttft"]
+    assert report["a"]["tokens_per_second"] > 0
+
+
+def test_first_mode_cancels_slower_models():
+    """Test erstes fertiges Modell gewinnt, die anderen werden abgebrochen"""
+    client = FakeModelsClient({"fast": 0.001, "slow": 0.05})
+
+    async def run():
+        fanout = FanOut(client, ["slow", "fast"], [], mode=FANOUT_FIRST).start()
+        return await fanout.wait(), fanout
+
+    results, fanout = asyncio.run(run())
+    assert results == {"fast": "fast0 fast1 fast2 fast3 fast4 "}
+    assert fanout.winner == "fast"
+    assert fanout.generations["slow"].cancelled
+    assert sorted(client.closed) == ["fast", "slow"]
+
+
+def test_first_mode_skips_failed_models():
+    """Test ein fehlgeschlagenes Modell gewinnt nicht"""
+    client = FakeModelsClient({"broken": 0.001, "ok": 0.005}, fail=("broken",))
+
+    async def run():
+        fanout = FanOut(client, ["broken", "ok"], [], mode=FANOUT_FIRST).start()
+        return await fanout.wait(), fanout
+
+    results, fanout = asyncio.run(run())
+    assert list(results) == ["ok"]
+    assert fanout.report()["broken"]["status"] == "failed"
+    assert fanout.report()["broken"]["error"] == "boom"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
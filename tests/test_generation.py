@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tests für controller/generation.py"""
+
+import pytest
+import asyncio
+import os
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.generation import Generation, GenerationManager
+from controller.memory import MemoryController
+
+
+class FakeStreamClient:
+    """Liefert Tokens wie OpenRouterClient.stream und merkt sich, ob der Stream geschlossen wurde"""
+
+    def __init__(self, tokens, delay=0):
+        self.tokens = tokens
+        self.delay = delay
+        self.produced = 0
+        self.closed = 0
+
+    async def stream(self, model, messages, info=None):
+        try:
+            for token in self.tokens:
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                self.produced += 1
+                yield token
+        finally:
+            self.closed += 1
+
+
+def test_generation_streams_and_records():
+    """Test vollständige Generation wird gelesen und gespeichert"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+
+        async def run():
+            generation = Generation(
+                FakeStreamClient(["Hal", "lo", "!"]), "m", [], memory=memory
+            ).start()
+            tokens = [token async for token in generation]
+            await generation.wait()
+            return tokens, generation
+
+        tokens, generation = asyncio.run(run())
+        assert tokens == ["Hal", "lo", "!"]
+        assert generation.status == "done"
+        memory.flush()
+        assert memory.page_before(None, 1)[0][3] == "Hallo!"
+        memory.close()
+
+
+def test_cancel_closes_stream_and_records_partial():
+    """Test Abbruch schließt den Stream und speichert die Teilantwort"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        client = FakeStreamClient([f"t{i} " for i in range(1000)], delay=0.001)
+
+        async def run():
+            generation = Generation(client, "m", [], memory=memory).start()
+            received = []
+            async for token in generation:
+                received.append(token)
+                if len(received) == 5:
+                    generation.cancel()
+            await generation.wait()
+            return received, generation
+
+        received, generation = asyncio.run(run())
+        assert generation.cancelled
+        assert client.closed == 1
+        assert client.produced < 1000
+        assert received[:5] == ["t0 ", "t1 ", "t2 ", "t3 ", "t4 "]
+        memory.flush()
+        assert memory.page_before(None, 1)[0][3].startswith("t0 t1 t2 t3 t4")
+        memory.close()
+
+
+def test_bounded_queue_applies_backpressure():
+    """Test langsamer Konsument bremst den Producer"""
+    client = FakeStreamClient([str(i) for i in range(500)])
+
+    async def run():
+        generation = Generation(client, "m", [], queue_size=8).start()
+        await asyncio.sleep(0.05)
+        blocked_at = client.produced
+        batch = await generation.next_batch()
+        generation.cancel()
+        await generation.wait()
+        return blocked_at, batch
+
+    blocked_at, batch = asyncio.run(run())
+    assert blocked_at <= 9
+    assert batch == [str(i) for i in range(8)]
+
+
+def test_full_queue_keeps_every_token_on_completion():
+    """Test volle Queue bei normalem Ende: langsamer Konsument erhält alle Tokens"""
+    tokens = [str(i) for i in range(20)]
+    client = FakeStreamClient(tokens)
+
+    async def run():
+        generation = Generation(client, "m", [], queue_size=4).start()
+        received = []
+        while True:
+            # Langsamer als der Producer, die Queue ist beim Ende voll
+            await asyncio.sleep(0.01)
+            batch = await generation.next_batch(max_tokens=1)
+            if not batch:
+                break
+            received.extend(batch)
+        await generation.wait()
+        return received, generation
+
+    received, generation = asyncio.run(run())
+    assert received == tokens
+    assert generation.status == "done"
+
+
+def test_manager_cancels_previous_generation():
+    """Test neue Generation bricht die vorherige ab"""
+    client = FakeStreamClient([str(i) for i in range(100)], delay=0.01)
+
+    async def run():
+        manager = GenerationManager(client)
+        first = manager.start("a", [])
+        await asyncio.sleep(0.03)
+        second = manager.start("b", [])
+        await first.wait()
+        second.cancel()
+        await second.wait()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.cancelled
+    assert second.cancelled
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Tests für controller/memory.py"""
+
+import pytest
+import os
+import sqlite3
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.memory import DURABILITY_BATCHED, MemoryController
+
+
+def test_add_and_recent_history():
+    """Test Nachrichten speichern und Verlauf laden"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        memory = MemoryController(db_path, max_history=2)
+        memory.add_message("user", "eins")
+        memory.add_message("ai", "zwei")
+        memory.add_message("user", "drei")
+        memory.close()
+
+        memory = MemoryController(db_path, max_history=2)
+        history = memory.get_full_history()
+        assert [m[2] for m in history] == ["zwei", "drei"]
+        memory.close()
+
+
+def test_page_before_keyset_pagination():
+    """Test Keyset-Pagination über ältere Nachrichten"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        for i in range(10):
+            memory.add_message("user", f"msg {i}")
+
+        page = memory.page_before(None, 4)
+        assert [m[3] for m in page] == ["msg 6", "msg 7", "msg 8", "msg 9"]
+
+        older = memory.page_before(page[0][0], 4)
+        assert [m[3] for m in older] == ["msg 2", "msg 3", "msg 4", "msg 5"]
+
+        oldest = memory.page_before(older[0][0], 4)
+        assert [m[3] for m in oldest] == ["msg 0", "msg 1"]
+        assert memory.page_before(oldest[0][0], 4) == []
+
+        plan = memory.worker.call(
+            lambda conn: conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM messages "
+                "WHERE conversation_id = 'default' AND id < 5 ORDER BY id DESC LIMIT 4"
+            ).fetchall()
+        )
+        assert "SCAN messages" not in " ".join(row[3] for row in plan)
+        memory.close()
+
+
+def test_conversations_are_separate():
+    """Test getrennte Konversationen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        first = MemoryController(db_path, conversation_id="a")
+        first.add_message("user", "in a")
+        first.close()
+
+        second = MemoryController(db_path, conversation_id="b")
+        second.add_message("user", "in b")
+        assert [m[3] for m in second.page_before(None, 10)] == ["in b"]
+        assert [m[3] for m in second.page_before(None, 10, conversation_id="a")] == [
+            "in a"
+        ]
+        second.close()
+
+
+def test_legacy_schema_is_migrated():
+    """Test Migration der alten Tabelle ohne Primärschlüssel"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE messages (timestamp REAL, sender TEXT, content TEXT)"
+        )
+        conn.execute("INSERT INTO messages VALUES (2.0, 'ai', 'neu')")
+        conn.execute("INSERT INTO messages VALUES (1.0, 'user', 'alt')")
+        conn.commit()
+        conn.close()
+
+        memory = MemoryController(db_path)
+        assert [m[3] for m in memory.page_before(None, 10)] == ["alt", "neu"]
+        memory.add_message("user", "danach")
+        assert memory.get_full_history()[-1][2] == "danach"
+        memory.close()
+
+
+def test_batched_writes_group_commit():
+    """Test gebündelte Commits nach Anzahl, flush() und close()"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        memory = MemoryController(
+            db_path, durability=DURABILITY_BATCHED, batch_size=3, commit_interval=60
+        )
+        memory.add_message("user", "eins")
+        memory.add_message("ai", "zwei")
+        memory.add_message("user", "drei").result()
+        assert memory.worker.uncommitted == 0
+
+        memory.add_message("ai", "vier").result()
+        assert memory.worker.uncommitted == 1
+        assert memory.flush() == 1
+
+        memory.add_message("user", "fünf")
+        # Lesen sieht auch noch nicht geschriebene Nachrichten
+        assert memory.page_before(None, 1)[0][3] == "fünf"
+        memory.add_message("ai", "sechs")
+        memory.close()
+
+        memory = MemoryController(db_path)
+        assert len(memory.page_before(None, 10)) == 6
+        memory.close()
+
+
+def test_batched_writes_commit_after_interval():
+    """Test zeitgesteuerter Group-Commit"""
+    import time
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(
+            os.path.join(temp_dir, "history.db"),
+            durability=DURABILITY_BATCHED,
+            commit_interval=0.05,
+        )
+        memory.add_message("user", "eins").result()
+        deadline = time.time() + 2
+        while memory.worker.uncommitted and time.time() < deadline:
+            time.sleep(0.01)
+        assert memory.worker.uncommitted == 0
+        memory.close()
+
+
+def test_closed_controller_raises():
+    """Test nach close() schlagen Zugriffe fehl statt zu hängen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(
+            os.path.join(temp_dir, "history.db"), durability=DURABILITY_BATCHED
+        )
+        memory.add_message("user", "vor dem Schließen")
+        memory.close()
+        memory.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            memory.page_before(None, 10)
+        with pytest.raises(sqlite3.ProgrammingError):
+            memory.add_message("user", "zu spät")
+
+        reopened = MemoryController(os.path.join(temp_dir, "history.db"))
+        assert [m[3] for m in reopened.page_before(None, 10)] == ["vor dem Schließen"]
+        reopened.close()
+
+
+def test_search_ranks_and_snippets():
+    """Test Volltextsuche mit Snippets und Paging"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        memory.add_message("user", "Wie schnell ist der Snapdragon im Galaxy S25?")
+        memory.add_message("ai", "Der Snapdragon 8 Elite taktet mit 3.2 GHz.")
+        memory.add_message("user", "Und die Kamera?")
+
+        hits = memory.search("snapdragon")
+        assert len(hits) == 2
+        assert all("[b]Snapdragon[/b]" in hit[4] for hit in hits)
+        assert len(memory.search("snapdragon", limit=1, offset=1)) == 1
+        assert [hit[3] for hit in memory.search("kam")] == ["user"]
+        assert memory.search('"') == []
+        memory.close()
+
+
+def test_search_within_conversation_beyond_rank_window(monkeypatch):
+    """Test Treffer einer Konversation werden nicht von neueren Treffern anderswo verdrängt"""
+    import controller.memory
+
+    monkeypatch.setattr(controller.memory, "SEARCH_RANK_WINDOW", 5)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        old = MemoryController(db_path, conversation_id="old")
+        old.add_message("user", "Galaxy von früher")
+        old.close()
+
+        memory = MemoryController(db_path, conversation_id="new")
+        for i in range(20):
+            memory.add_message("user", f"Galaxy {i}")
+        assert len(memory.search("galaxy", limit=3)) == 3
+        hits = memory.search("galaxy", limit=3, conversation_id="old")
+        assert [hit[1] for hit in hits] == ["old"]
+        memory.close()
+
+
+def test_search_index_built_for_existing_database():
+    """Test Index für bestehende Datenbanken und Rebuild"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "history.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE messages (timestamp REAL, sender TEXT, content TEXT)"
+        )
+        conn.execute("INSERT INTO messages VALUES (1.0, 'user', 'Hallo Galaxy')")
+        conn.commit()
+        conn.close()
+
+        memory = MemoryController(db_path)
+        assert len(memory.search("galaxy")) == 1
+        assert memory.rebuild_search_index() == 1
+        assert len(memory.search("galaxy")) == 1
+        memory.close()
+
+
+def test_shared_across_threads_and_asyncio():
+    """Test Zugriff aus Executor-Threads und asyncio"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(
+            os.path.join(temp_dir, "history.db"),
+            max_history=500,
+            durability=DURABILITY_BATCHED,
+        )
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(
+                executor.map(
+                    lambda i: memory.add_message("user", f"msg {i}"), range(200)
+                )
+            )
+
+        async def run():
+            message_id = await memory.add_message_async("ai", "async")
+            page = await memory.page_before_async(None, 1)
+            return message_id, page
+
+        message_id, page = asyncio.run(run())
+        assert page[0][0] == message_id
+        assert len(memory.get_full_history()) == 201
+        assert len(memory.page_before(None, 500)) == 201
+        memory.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Tests für controller/metrics.py"""
+
+import pytest
+import json
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller import metrics
+from controller.memory import DURABILITY_BATCHED, MemoryController
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    was_enabled = metrics.enabled()
+    metrics.reset()
+    yield
+    metrics.reset()
+    (metrics.enable if was_enabled else metrics.disable)()
+
+
+def test_disabled_metrics_record_nothing():
+    """Test ausgeschaltet werden keine Werte gesammelt"""
+    metrics.disable()
+    metrics.inc("cache.misses")
+    metrics.observe("stream.ttft", 0.5)
+    with metrics.timer("db.commit"):
+        pass
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"] == {}
+    assert snapshot["histograms"] == {}
+
+
+def test_counters_histograms_and_ratios():
+    """Test Zähler, Perzentile und abgeleitete Trefferquote"""
+    metrics.enable()
+    metrics.inc("cache.memory_hits", 2)
+    metrics.inc("cache.disk_hits")
+    metrics.inc("cache.misses")
+    for ms in range(1, 101):
+        metrics.observe("stream.ttft", ms / 1000)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["ratios"]["cache.hit_ratio"] == 0.75
+    ttft = snapshot["histograms"]["stream.ttft"]
+    assert ttft["count"] == 100
+    assert ttft["min"] == 0.001
+    assert ttft["max"] == 0.1
+    assert ttft["p50"] == 0.051
+    assert ttft["p95"] == 0.096
+
+
+def test_memory_controller_reports_commits_and_dump():
+    """Test DB-Commits werden gemessen und als JSON exportiert"""
+    metrics.enable()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        memory = MemoryController(
+            os.path.join(temp_dir, "history.db"),
+            durability=DURABILITY_BATCHED,
+            batch_size=10,
+        )
+        for i in range(25):
+            memory.submit_message("user", f"Nachricht {i}")
+        memory.flush()
+        memory.close()
+
+        data = metrics.dump(os.path.join(temp_dir, "metrics.json"))
+        with open(os.path.join(temp_dir, "metrics.json"), encoding="utf-8") as f:
+            assert json.load(f) == json.loads(json.dumps(data))
+
+    assert data["counters"]["memory.messages"] == 25
+    assert data["counters"]["db.committed_writes"] == 25
+    assert data["histograms"]["db.commit"]["count"] >= 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Tests für controller/network.py (Connection-Pool, mit httpx.MockTransport)"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+httpx = pytest.importorskip("httpx")
+
+from controller import network
+from controller.network import DEFAULT_TIMEOUT, MODELS_TIMEOUT, OpenRouterClient
+from controller.resilience import Resilience, RetryPolicy
+
+
+class Recorder:
+    """MockTransport-Handler: merkt sich Requests, antwortet wie OpenRouter"""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.url.path.endswith("/models"):
+            return httpx.Response(200, json={"data": [{"id": "a/b"}]})
+        body = b"".join(
+            b"data: "
+            + json.dumps({"choices": [{"delta": {"content": t}}]}).encode()
+            + b"\n\n"
+            for t in ["Hal", "lo"]
+        )
+        return httpx.Response(200, content=body + b"data: [DONE]\n\n")
+
+
+def make_client(recorder, **kwargs):
+    return OpenRouterClient(
+        transport=httpx.MockTransport(recorder),
+        resilience=Resilience(retry=RetryPolicy(max_attempts=1)),
+        api_key="sk-test",
+        **kwargs,
+    )
+
+
+def test_pool_is_reused_across_calls():
+    """Test alle Requests laufen über denselben AsyncClient"""
+    recorder = Recorder()
+
+    async def run():
+        client = make_client(recorder)
+        await client.fetch_models()
+        pool = client._client
+        assert (
+            await client.complete("a/b", [{"role": "user", "content": "Hi"}]) == "Hallo"
+        )
+        await client.fetch_models()
+        assert client._client is pool
+        await client.aclose()
+
+    asyncio.run(run())
+    assert len(recorder.requests) == 3
+    assert all(
+        r.headers["Authorization"] == "Bearer sk-test" for r in recorder.requests
+    )
+
+
+def test_close_and_rebuild():
+    """Test aclose()/async with schließen den Pool, der nächste Request baut ihn neu"""
+    recorder = Recorder()
+
+    async def run():
+        async with make_client(recorder) as client:
+            await client.fetch_models()
+            first = client._client
+        assert first.is_closed
+        assert client._client is None
+
+        assert await client.fetch_models() == [{"id": "a/b"}]
+        assert client._client is not first
+        await client.set_api_key("sk-neu")
+        await client.fetch_models()
+        await client.aclose()
+
+    asyncio.run(run())
+    assert recorder.requests[-1].headers["Authorization"] == "Bearer sk-neu"
+
+
+def test_per_request_timeouts():
+    """Test Modelle, Streams und explizite Timeouts setzen ihren eigenen Timeout"""
+    recorder = Recorder()
+    messages = [{"role": "user", "content": "Hi"}]
+
+    async def run():
+        async with make_client(recorder) as client:
+            await client.fetch_models()
+            await client.complete("a/b", messages)
+            await client.complete("a/b", messages, timeout=httpx.Timeout(3.0))
+
+    asyncio.run(run())
+    timeouts = [r.extensions["timeout"] for r in recorder.requests]
+    assert timeouts[0] == MODELS_TIMEOUT.as_dict()
+    assert timeouts[1] == DEFAULT_TIMEOUT.as_dict()
+    assert timeouts[2] == httpx.Timeout(3.0).as_dict()
+
+
+def test_api_key_from_provider_then_env(monkeypatch):
+    """Test Key aus den Einstellungen vor OPENROUTER_API_KEY, ohne Key kein Authorization-Header"""
+    monkeypatch.setattr(network, "_api_key_provider", None)
+    monkeypatch.delenv("OPENROUTER_API_KEY", raising=False)
+    assert network.resolve_api_key() == ""
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "sk-env")
+    network.set_api_key_provider(lambda: None)
+    assert network.resolve_api_key() == "sk-env"
+    network.set_api_key_provider(lambda: "sk-config")
+    assert network.resolve_api_key() == "sk-config"
+
+    monkeypatch.delenv("OPENROUTER_API_KEY")
+    network.set_api_key_provider(lambda: None)
+    recorder = Recorder()
+
+    async def run():
+        async with OpenRouterClient(
+            transport=httpx.MockTransport(recorder),
+            resilience=Resilience(retry=RetryPolicy(max_attempts=1)),
+        ) as client:
+            await client.fetch_models()
+
+    asyncio.run(run())
+    assert "Authorization" not in recorder.requests[0].headers
+
+
+def test_api_key_provider_error_falls_back_to_env(monkeypatch):
+    """Test Fehler beim Entschlüsseln: OPENROUTER_API_KEY statt Absturz"""
+    from controller.secret_store import SecretsUnavailable
+
+    monkeypatch.setattr(network, "_api_key_provider", None)
+    monkeypatch.setenv("OPENROUTER_API_KEY", "sk-env")
+
+    def broken():
+        raise ValueError("Schlüssel passt nicht")
+
+    network.set_api_key_provider(broken)
+    assert network.resolve_api_key() == "sk-env"
+
+    def unavailable():
+        raise SecretsUnavailable("cryptography fehlt")
+
+    network.set_api_key_provider(unavailable)
+    assert network.resolve_api_key() == "sk-env"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Tests für controller/resilience.py gegen einen lokalen Fake-Server"""
+
+import pytest
+import asyncio
+import http.client
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.resilience import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryPolicy,
+    TokenBucket,
+    TransientError,
+    check_status,
+    parse_retry_after,
+)
+from controller.sse import ChatStreamDecoder
+
+
+class FakeOpenRouter(BaseHTTPRequestHandler):
+    """Spielt pro Request den nächsten Eintrag aus `script` ab"""
+
+    script = []
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests += 1
+        action = self.script.pop(0) if self.script else ("ok", None)
+        kind, value = action
+        if kind == "drop":
+            # Verbindung ohne Antwort schließen
+            self.close_connection = True
+            return
+        if kind == "status":
+            self.send_response(value)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if kind == "stream":
+            tokens, complete = value
+            body = b"".join(
+                b"data: "
+                + json.dumps({"choices": [{"delta": {"content": t}}]}).encode()
+                + b"\n\n"
+                for t in tokens
+            )
+            if complete:
+                body += b"data: [DONE]\n\n"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            # Bei abgebrochenem Stream mehr ankündigen als gesendet wird
+            self.send_header(
+                "Content-Length", str(len(body) + (0 if complete else 100))
+            )
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = json.dumps({"data": [{"id": "a/b"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    FakeOpenRouter.script = []
+    FakeOpenRouter.requests = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenRouter)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch(url):
+    """Blockierender GET, Fehler werden wie im OpenRouterClient klassifiziert"""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as res:
+            return json.loads(res.read())
+    except urllib.error.HTTPError as e:
+        check_status(e.code, e.headers)
+        raise
+    except (ConnectionError, http.client.HTTPException) as e:
+        raise TransientError(str(e)) from e
+
+
+async def fetch_async(url):
+    return await asyncio.to_thread(fetch, url)
+
+
+def open_stream(url):
+    async def tokens():
+        decoder = ChatStreamDecoder()
+        try:
+            res = await asyncio.to_thread(urllib.request.urlopen, url, timeout=5)
+        except urllib.error.HTTPError as e:
+            check_status(e.code, e.headers)
+            raise
+        except (ConnectionError, http.client.HTTPException) as e:
+            raise TransientError(str(e)) from e
+        while not decoder.info.done:
+            line = await asyncio.to_thread(res.readline)
+            if not line:
+                raise TransientError("stream ended early")
+            for token in decoder.feed(line):
+                yield token
+        res.close()
+
+    return tokens
+
+
+def fast_resilience(**kwargs):
+    return Resilience(retry=RetryPolicy(max_attempts=4, base_delay=0.001), **kwargs)
+
+
+def test_retries_5xx_and_dropped_connections(server):
+    """Test 503, 429 und Verbindungsabbruch werden wiederholt"""
+    FakeOpenRouter.script = [("status", 503), ("drop", None), ("status", 429)]
+    resilience = fast_resilience()
+
+    result = asyncio.run(resilience.call(fetch_async, server + "/models"))
+    assert result == {"data": [{"id": "a/b"}]}
+    assert FakeOpenRouter.requests == 4
+    assert resilience.stats["retries"] == 3
+
+
+def test_gives_up_after_max_attempts(server):
+    """Test nach max_attempts wird der letzte Fehler weitergegeben"""
+    FakeOpenRouter.script = [("status", 502)] * 10
+    resilience = fast_resilience()
+
+    with pytest.raises(TransientError) as exc:
+        asyncio.run(resilience.call(fetch_async, server + "/models"))
+    assert exc.value.status == 502
+    assert FakeOpenRouter.requests == 4
+
+
+def test_client_errors_are_not_retried(server):
+    """Test 4xx (außer 408/425/429) wird nicht wiederholt"""
+    FakeOpenRouter.script = [("status", 401)]
+    resilience = fast_resilience()
+
+    with pytest.raises(urllib.error.HTTPError):
+        asyncio.run(resilience.call(fetch_async, server + "/models"))
+    assert FakeOpenRouter.requests == 1
+
+
+def test_stream_retries_only_before_first_token(server):
+    """Test Stream wird vor dem ersten Token neu geöffnet, danach nicht mehr"""
+    FakeOpenRouter.script = [("status", 503), ("stream", (["Hal", "lo"], True))]
+    resilience = fast_resilience()
+
+    async def collect():
+        return [t async for t in resilience.stream(open_stream(server + "/chat"))]
+
+    assert asyncio.run(collect()) == ["Hal", "lo"]
+    assert FakeOpenRouter.requests == 2
+
+    FakeOpenRouter.script = [("stream", (["Hal"], False)), ("stream", (["nie"], True))]
+    received = []
+
+    async def collect_partial():
+        async for token in resilience.stream(open_stream(server + "/chat")):
+            received.append(token)
+
+    with pytest.raises(TransientError):
+        asyncio.run(collect_partial())
+    assert received == ["Hal"]
+    assert FakeOpenRouter.requests == 3
+
+
+def test_circuit_breaker_fails_fast_and_recovers(server):
+    """Test offener Breaker weist ab, ohne den Server zu kontaktieren"""
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=30, clock=lambda: now[0]
+    )
+    resilience = Resilience(retry=RetryPolicy(max_attempts=1), breaker=breaker)
+    FakeOpenRouter.script = [("status", 500), ("status", 500)]
+
+    for _ in range(2):
+        with pytest.raises(TransientError):
+            asyncio.run(resilience.call(fetch_async, server + "/models"))
+    assert breaker.state == BREAKER_OPEN
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilience.call(fetch_async, server + "/models"))
+    assert FakeOpenRouter.requests == 2
+    assert resilience.stats["rejected"] == 1
+
+    now[0] = 31
+    assert breaker.state == BREAKER_HALF_OPEN
+    asyncio.run(resilience.call(fetch_async, server + "/models"))
+    assert breaker.failures == 0
+    assert FakeOpenRouter.requests == 3
+
+
+def test_half_open_probe_released_on_other_errors():
+    """Test Probe im Half-Open-Zustand blockiert nach Fehler oder Abbruch nicht dauerhaft"""
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=30, clock=lambda: now[0]
+    )
+    resilience = Resilience(retry=RetryPolicy(max_attempts=1), breaker=breaker)
+
+    async def transient():
+        raise TransientError("HTTP 503", status=503)
+
+    async def broken():
+        raise ValueError("kaputt")
+
+    async def ok():
+        return "ok"
+
+    with pytest.raises(TransientError):
+        asyncio.run(resilience.call(transient))
+    now[0] = 31
+    with pytest.raises(ValueError):
+        asyncio.run(resilience.call(broken))
+    assert breaker.state == BREAKER_HALF_OPEN
+
+    async def cancelled_stream():
+        async def tokens():
+            await asyncio.sleep(10)
+            yield "nie"
+
+        task = asyncio.ensure_future(resilience.stream(tokens).__anext__())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_stream())
+    now[0] = 100
+    assert asyncio.run(resilience.call(ok)) == "ok"
+    assert breaker.state == BREAKER_CLOSED
+
+
+def test_stream_closes_inner_stream_on_early_exit():
+    """Test vorzeitig beendeter Stream schließt den inneren Stream sofort"""
+    resilience = Resilience(retry=RetryPolicy(max_attempts=1))
+    closed = []
+
+    async def tokens():
+        try:
+            for token in ["Hal", "lo", "!"]:
+                yield token
+        finally:
+            closed.append(True)
+
+    async def run():
+        stream = resilience.stream(tokens)
+        async for token in stream:
+            break
+        await stream.aclose()
+        # Geschlossen, bevor der Loop (oder der GC) aufräumt
+        assert closed == [True]
+        return token
+
+    assert asyncio.run(run()) == "Hal"
+
+
+def test_token_bucket_and_retry_after():
+    """Test Token Bucket verteilt Wartezeiten, Retry-After hat Vorrang"""
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.1, 0.2]
+    now[0] = 1.0
+    assert bucket.reserve() == 0.0
+
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    assert policy.delay(0, retry_after=7) == 7
+    assert all(0 <= policy.delay(5) <= 4 for _ in range(50))
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470) == 10.0
+    assert parse_retry_after("bogus") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
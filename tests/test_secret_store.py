@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Tests für controller/secret_store.py und die Secrets in SecureConfigManager"""
+
+import pytest
+import json
+import os
+import stat
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.secret_store import (
+    FileKeystore,
+    Keystore,
+    KeyringKeystore,
+    SecretCipher,
+    SecretsUnavailable,
+    default_keystore,
+    derive_key,
+    new_salt,
+)
+from utils import SecureConfigManager
+
+
+def test_file_keystore_creates_private_master_secret():
+    """Test Master-Secret wird einmal erzeugt und nur für den Besitzer lesbar gespeichert"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "keys", ".master.key")
+        secret = FileKeystore(path).master_secret()
+        assert len(secret) == 32
+        assert FileKeystore(path).master_secret() == secret
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_key_derivation_is_cached_per_process():
+    """Test PBKDF2 läuft pro (Secret, Salt) nur einmal"""
+    derive_key.cache_clear()
+    salt = new_salt()
+    first = derive_key(b"x" * 32, salt, 1000)
+    assert derive_key(b"x" * 32, salt, 1000) is first
+    assert derive_key.cache_info().hits == 1
+    assert derive_key(b"x" * 32, new_salt(), 1000) != first
+
+
+def test_secrets_without_cryptography_fail_clearly():
+    """Test ohne cryptography werden keine Secrets im Klartext gespeichert"""
+    try:
+        import cryptography  # noqa: F401
+
+        pytest.skip("cryptography ist installiert")
+    except ImportError:
+        pass
+    with tempfile.TemporaryDirectory() as temp_dir:
+        keystore = FileKeystore(os.path.join(temp_dir, ".master.key"))
+        config = SecureConfigManager(config_dir=temp_dir, keystore=keystore)
+        with pytest.raises(SecretsUnavailable):
+            config.set_secret("openrouter_api_key", "sk-or-test")
+        assert "secrets" not in config.config
+        assert config.get_secret("openrouter_api_key") is None
+
+
+def test_secret_round_trip_is_encrypted_at_rest():
+    """Test Secret liegt verschlüsselt in config.json und wird lazy entschlüsselt"""
+    pytest.importorskip("cryptography")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        keystore = FileKeystore(os.path.join(temp_dir, ".master.key"))
+        config = SecureConfigManager(config_dir=temp_dir, keystore=keystore)
+        config.set_secret("openrouter_api_key", "sk-or-geheim")
+        with open(config.config_file, encoding="utf-8") as f:
+            raw = f.read()
+        assert "sk-or-geheim" not in raw
+        assert json.loads(raw)["theme"] == "dark"
+
+        reloaded = SecureConfigManager(config_dir=temp_dir, keystore=keystore)
+        assert reloaded._secret_cipher is None
+        assert reloaded.get("theme") == "dark"
+        assert reloaded._secret_cipher is None
+        assert reloaded.get_secret("openrouter_api_key") == "sk-or-geheim"
+
+        other_key = SecretCipher(
+            FileKeystore(os.path.join(temp_dir, "other.key")),
+            reloaded.config["secrets"]["salt"],
+        )
+        with pytest.raises(ValueError):
+            other_key.decrypt(
+                reloaded.config["secrets"]["values"]["openrouter_api_key"]
+            )
+
+        reloaded.set_secret("openrouter_api_key", None)
+        fresh = SecureConfigManager(config_dir=temp_dir, keystore=keystore)
+        assert fresh.get_secret("openrouter_api_key") is None
+
+
+def test_keystore_is_abstract():
+    """Test Keystore-Unterklassen müssen load() und store() implementieren"""
+    with pytest.raises(TypeError):
+        Keystore()
+
+
+def test_default_keystore_prefers_platform_and_migrates_key_file(monkeypatch):
+    """Test Schlüsselbund vor Schlüsseldatei; eine alte Datei wird übernommen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setattr(KeyringKeystore, "available", staticmethod(lambda: False))
+        fallback = default_keystore(temp_dir)
+        assert isinstance(fallback, FileKeystore)
+        secret = fallback.master_secret()
+
+        stored = {}
+        monkeypatch.setattr(KeyringKeystore, "available", staticmethod(lambda: True))
+        monkeypatch.setattr(KeyringKeystore, "load", lambda self: stored.get("secret"))
+        monkeypatch.setattr(
+            KeyringKeystore, "store", lambda self, s: stored.update(secret=s)
+        )
+        keystore = default_keystore(temp_dir)
+        assert isinstance(keystore, KeyringKeystore)
+        assert keystore.master_secret() == secret
+        assert not os.path.exists(fallback.path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Tests für controller/singleflight.py"""
+
+import pytest
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    """Test Doppelklick: gleiche Anfrage läuft nur einmal im Executor"""
+    executor = ThreadPoolExecutor(max_workers=3)
+    flight = SingleFlight()
+    calls = []
+
+    def make_api_request(message):
+        calls.append(message)
+        time.sleep(0.05)
+        return message.upper()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+
+        def request(message):
+            return flight.run(
+                message,
+                lambda: loop.run_in_executor(executor, make_api_request, message),
+            )
+
+        return await asyncio.gather(
+            request("hallo"), request("hallo"), request("hallo"), request("tschüss")
+        )
+
+    results = asyncio.run(run())
+    executor.shutdown()
+    assert results == ["HALLO", "HALLO", "HALLO", "TSCHÜSS"]
+    assert sorted(calls) == ["hallo", "tschüss"]
+    assert flight.calls == 2
+    assert flight.coalesced == 2
+    assert len(flight) == 0
+
+
+def test_key_is_released_after_completion_and_errors_are_shared():
+    """Test Fehler erreichen alle Wartenden, danach läuft die Anfrage neu"""
+    flight = SingleFlight()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("offline")
+
+    async def run():
+        results = await asyncio.gather(
+            flight.run("k", failing), flight.run("k", failing), return_exceptions=True
+        )
+        with pytest.raises(RuntimeError):
+            await flight.run("k", failing)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(attempts) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    """Test Abbruch eines Wartenden lässt die anderen weiterlaufen"""
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def run():
+        first = asyncio.ensure_future(flight.run("k", slow))
+        second = asyncio.ensure_future(flight.run("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "ok"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Tests für controller/sse.py"""
+
+import pytest
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.sse import ChatStreamDecoder, SSEParser, fast_delta
+
+
+def test_parser_handles_split_chunks_and_fields():
+    """Test Events über Chunk-Grenzen, Mehrzeilen-Daten und Felder"""
+    parser = SSEParser()
+    raw = ": keep-alive\r\nevent: update\r\nid: 7\r\ndata: eins\r\ndata: zwei\r\n\r\ndata: ä\n\n"
+    events = []
+    for i in range(len(raw.encode())):
+        events.extend(parser.feed(raw.encode()[i : i + 1]))
+
+    assert len(events) == 2
+    assert events[0].event == "update"
+    assert events[0].id == "7"
+    assert events[0].data == "eins\nzwei"
+    assert events[1].data == "ä"
+    assert events[1].event == "message"
+    assert parser.comments == 1
+
+
+def test_fast_delta():
+    """Test Fast-Path nur für einfache Delta-Frames"""
+    plain = '{"choices":[{"delta":{"role":"assistant","content":"Hallo"},"finish_reason":null}]}'
+    escaped = '{"choices":[{"delta":{"content":"\\"Hi\\""},"finish_reason":null}]}'
+    final = '{"choices":[{"delta":{"content":""},"finish_reason":"stop"}]}'
+
+    assert fast_delta(plain) == "Hallo"
+    assert fast_delta(escaped) is None
+    assert fast_delta(final) is None
+
+
+def test_decoder_reports_metadata_and_malformed_frames():
+    """Test finish_reason, usage und fehlerhafte Frames werden gemeldet"""
+    decoder = ChatStreamDecoder()
+    tokens = decoder.feed(
+        b'data: {"choices":[{"delta":{"content":"Hi"},"finish_reason":null}]}\n\n'
+        b"data: {kaputt\n\n"
+        b'data: {"choices":[{"delta":{"content":" \\"S25\\""},"finish_reason":null}]}\n\n'
+        b'data: {"choices":[{"delta":{},"finish_reason":"stop"}],"usage":{"total_tokens":5}}\n\n'
+        b"data: [DONE]\n\n"
+        b'data: {"choices":[{"delta":{"content":"zu spaet"},"finish_reason":null}]}\n\n'
+    )
+
+    assert tokens == ["Hi", ' "S25"']
+    info = decoder.info
+    assert info.done
+    assert info.finish_reason == "stop"
+    assert info.usage == {"total_tokens": 5}
+    assert info.malformed == ["{kaputt"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Tests für controller/startup.py"""
+
+import pytest
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.startup import ImportTimer, StartupProfiler, Warmup
+
+
+def test_import_timer_builds_nested_tree():
+    """Test Import-Baum zeigt wer wen importiert, mit Eigen- und Gesamtzeit"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(os.path.join(temp_dir, "slow_parent_mod.py"), "w") as f:
+            f.write("import time\nimport slow_child_mod\ntime.sleep(0.01)\n")
+        with open(os.path.join(temp_dir, "slow_child_mod.py"), "w") as f:
+            f.write("import time\ntime.sleep(0.02)\n")
+        sys.path.insert(0, temp_dir)
+        timer = ImportTimer().install()
+        try:
+            import slow_parent_mod  # noqa: F401
+        finally:
+            timer.uninstall()
+            sys.path.remove(temp_dir)
+            sys.modules.pop("slow_parent_mod", None)
+            sys.modules.pop("slow_child_mod", None)
+
+    tree = timer.tree()
+    assert [(depth, name) for depth, name, _, _ in tree] == [
+        (0, "slow_parent_mod"),
+        (1, "slow_child_mod"),
+    ]
+    _, _, parent_self, parent_total = tree[0]
+    _, _, child_self, child_total = tree[1]
+    assert parent_total >= 0.03
+    assert child_total >= 0.02
+    assert 0.01 <= parent_self < parent_total
+    assert timer not in sys.meta_path
+
+
+def test_profiler_report_and_budget():
+    """Test Bericht enthält Phasen und Budget-Urteil"""
+    profiler = StartupProfiler(budget=10, imports=False, started=time.perf_counter())
+    profiler.mark("kv")
+    assert not profiler.within_budget()
+    assert "nicht erreicht" in profiler.report()
+    profiler.mark("first_frame")
+    assert profiler.within_budget()
+    report = profiler.report()
+    assert "kv" in report
+    assert "OK" in report
+
+    profiler = StartupProfiler(budget=0, imports=False)
+    time.sleep(0.001)
+    profiler.mark("first_frame")
+    assert "ÜBER BUDGET" in profiler.report()
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/stat"), reason="nur mit /proc (Linux, Android)"
+)
+def test_profiler_counts_from_process_start():
+    """Test Basis ist der Prozessstart, nicht der Import von controller.startup"""
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import time; time.sleep(0.3)\n"
+        "from controller.startup import StartupProfiler\n"
+        "profiler = StartupProfiler(imports=False)\n"
+        "profiler.mark('x')\n"
+        "print(profiler.elapsed('x'))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=root, capture_output=True, text=True
+    ).stdout
+    assert 0.3 <= float(output) < 5
+
+
+def test_warmup_runs_in_background_and_keeps_errors():
+    """Test Warmup läuft im eigenen Thread, Fehler brechen ihn nicht ab"""
+    threads = []
+    profiler = StartupProfiler(imports=False)
+
+    def failing():
+        raise RuntimeError("offline")
+
+    warmup = Warmup([("broken", failing)], profiler=profiler)
+    warmup.add("thread", lambda: threads.append(threading.current_thread().name))
+    assert warmup.start().wait(5)
+    assert threads == ["aiDroid-warmup"]
+    assert isinstance(warmup.errors["broken"], RuntimeError)
+    assert set(warmup.durations) == {"broken", "thread"}
+    assert profiler.elapsed("warmup: thread") is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Tests für controller/stream_cache.py"""
+
+import pytest
+import asyncio
+import os
+import tempfile
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controller.cache import MemoryLRU, ResponseCache
+from controller.generation import Generation
+from controller.memory import MemoryController
+from controller.stream_cache import CachingClient
+
+
+class FakeStreamClient:
+    """Liefert Tokens wie OpenRouterClient.stream, optional mit Fehler oder abgeschnitten"""
+
+    def __init__(self, tokens, fail=False, finish_reason="stop", done=True):
+        self.tokens = tokens
+        self.fail = fail
+        self.finish_reason = finish_reason
+        self.done = done
+        self.calls = 0
+
+    async def stream(self, model, messages, info=None):
+        self.calls += 1
+        for token in self.tokens:
+            await asyncio.sleep(0)
+            yield token
+        if self.fail:
+            raise RuntimeError("connection lost")
+        if info is not None:
+            info.finish_reason = self.finish_reason
+            info.done = self.done
+
+
+MESSAGES = [{"role": "user", "content": "Wer bist du?"}]
+
+
+def test_streamed_answer_is_cached_and_replayed():
+    """Test erste Antwort wird gespeichert, zweite kommt als synthetischer Stream"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "responses.db"))
+        memory = MemoryController(os.path.join(temp_dir, "history.db"))
+        inner = FakeStreamClient(["Ich ", "bin ", "aiDroid", "."])
+        client = CachingClient(inner, cache, memory=memory)
+
+        async def run():
+            first = await Generation(client, "a/x", MESSAGES).start().wait()
+            await client.drain()
+            generation = Generation(client, "a/x", MESSAGES).start()
+            tokens = [token async for token in generation]
+            other_model = await Generation(client, "b/y", MESSAGES).start().wait()
+            await client.drain()
+            return first, tokens, generation, other_model
+
+        first, tokens, generation, other_model = asyncio.run(run())
+        assert first == "Ich bin aiDroid."
+        assert "".join(tokens) == first
+        assert generation.info.cached
+        assert generation.info.finish_reason == "stop"
+        assert other_model == first
+        # Zweites Modell ist ein eigener Cache-Eintrag
+        assert inner.calls == 2
+        assert client.stats == {"hits": 1, "misses": 2, "stored": 2}
+
+        memory.flush()
+        assert [row[3] for row in memory.page_before(None, 10)] == [first] * 3
+        memory.close()
+        cache.close()
+
+
+def test_failed_or_cancelled_streams_are_not_cached():
+    """Test abgebrochene oder fehlerhafte Streams landen nicht im Cache"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "responses.db"))
+        failing = CachingClient(FakeStreamClient(["hal", "b"], fail=True), cache)
+        slow = CachingClient(
+            FakeStreamClient([str(i) for i in range(1000)]),
+            cache,
+            memory_cache=MemoryLRU(),
+        )
+
+        async def run():
+            broken = Generation(failing, "a/x", MESSAGES).start()
+            await broken.wait()
+            cancelled = Generation(slow, "b/y", MESSAGES).start()
+            await cancelled.next_batch()
+            cancelled.cancel()
+            await cancelled.wait()
+            await failing.drain()
+            await slow.drain()
+            return broken, cancelled
+
+        broken, cancelled = asyncio.run(run())
+        assert broken.status == "failed"
+        assert cancelled.cancelled
+        assert cache.info()["entries"] == 0
+        assert len(slow.memory_cache) == 0
+        cache.close()
+
+
+def test_truncated_streams_are_not_cached():
+    """Test abgeschnittene Antworten (finish_reason "length", Ende ohne [DONE]) werden nicht gespeichert"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ResponseCache(os.path.join(temp_dir, "responses.db"))
+        length = CachingClient(
+            FakeStreamClient(["Ich ", "bin"], finish_reason="length"), cache
+        )
+        eof = CachingClient(
+            FakeStreamClient(["Ich ", "bin"], finish_reason=None, done=False), cache
+        )
+
+        async def run():
+            texts = []
+            for client in (length, eof):
+                texts.append(await Generation(client, "a/x", MESSAGES).start().wait())
+                await client.drain()
+            return texts
+
+        assert asyncio.run(run()) == ["Ich bin", "Ich bin"]
+        assert cache.info()["entries"] == 0
+        assert length.stats["stored"] == eof.stats["stored"] == 0
+        cache.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -31,6 +31,45 @@ async def test_async_processing():
     assert len(response) > 0
 
 
+@pytest.mark.asyncio
+async def test_many_concurrent_requests_without_thread_growth():
+    """Test viele gleichzeitige Anfragen laufen ohne zusätzliche Threads"""
+    import asyncio
+    import threading
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        handler = AsyncNetworkHandler()
+        handler.cache_dir = temp_dir
+        handler.max_concurrent_requests = 200
+
+        threads_before = threading.active_count()
+        responses = await asyncio.gather(
+            *(handler.process_request_async(f"Nachricht {i}") for i in range(200))
+        )
+        assert len(responses) == 200
+        assert all("Nachricht" in r for r in responses)
+        # Höchstens die drei Executor-Threads für den Festplatten-Cache
+        assert threading.active_count() <= threads_before + 3
+
+
+def test_request_slots_work_across_event_loops():
+    """Test Anfragen funktionieren auch in einem zweiten Event-Loop"""
+    import asyncio
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        handler = AsyncNetworkHandler({"max_concurrent_requests": 1})
+        handler.cache_dir = temp_dir
+
+        async def burst(prefix):
+            return await asyncio.gather(
+                *(handler.process_request_async(f"{prefix} {i}") for i in range(3))
+            )
+
+        for prefix in ("Erster Loop", "Zweiter Loop"):
+            responses = asyncio.run(burst(prefix))
+            assert not any(r.startswith("❌") for r in responses)
+
+
 def test_cache_functionality():
     """Test Caching-Funktionalität"""
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -63,5 +102,81 @@ def test_config_manager():
         assert config_manager.get("device_optimization") == "samsung_s25"
 
 
+def test_config_batch_writes_once_and_notifies():
+    """Test Batch schreibt einmal atomar und meldet die Änderungen"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_manager = SecureConfigManager(config_dir=temp_dir)
+        writes = []
+        original_save = config_manager.save_config
+        config_manager.save_config = lambda config=None: (
+            writes.append(1),
+            original_save(config),
+        )
+        changes = []
+        theme_changes = []
+        config_manager.add_listener(changes.append)
+        config_manager.add_listener(theme_changes.append, keys=["theme"])
+
+        config_manager.optimize_for_s25()
+        assert len(writes) == 1
+        assert changes == [{"display_refresh_rate": 120, "memory_optimization": True}]
+
+        with config_manager.batch():
+            config_manager.set("theme", "light")
+            config_manager.set("timeout", 10)
+        assert len(writes) == 2
+        assert theme_changes == [{"theme": "light"}]
+        assert not os.path.exists(config_manager.config_file + ".tmp")
+
+        with open(config_manager.config_file, encoding="utf-8") as f:
+            import json
+
+            stored = json.load(f)
+        assert stored["theme"] == "light"
+        assert stored["memory_optimization"] is True
+
+
+def test_config_batch_rolls_back_on_error():
+    """Test Exception im Batch nimmt alle Änderungen zurück"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_manager = SecureConfigManager(config_dir=temp_dir)
+        with pytest.raises(RuntimeError):
+            with config_manager.batch():
+                config_manager.set("theme", "light")
+                config_manager.set("new_key", 1)
+                raise RuntimeError("abbrechen")
+        assert config_manager.get("theme") == "dark"
+        assert "new_key" not in config_manager.config
+        assert SecureConfigManager(config_dir=temp_dir).get("theme") == "dark"
+
+
+def test_config_in_place_change_is_saved():
+    """Test in-place geänderte Werte werden beim set() gespeichert"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_manager = SecureConfigManager(config_dir=temp_dir)
+        config_manager.set("chat", {})
+        chat = config_manager.get("chat")
+        chat["font"] = 18
+        config_manager.set("chat", chat)
+        assert SecureConfigManager(config_dir=temp_dir).get("chat") == {"font": 18}
+
+
+def test_config_write_behind_coalesces_writes():
+    """Test verzögertes Schreiben fasst schnelle Änderungen zusammen"""
+    import time
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_manager = SecureConfigManager(config_dir=temp_dir, write_delay=0.05)
+        for i in range(20):
+            config_manager.set("counter", i)
+        assert SecureConfigManager(config_dir=temp_dir).get("counter") is None
+        time.sleep(0.2)
+        assert SecureConfigManager(config_dir=temp_dir).get("counter") == 19
+
+        config_manager.set("counter", 99)
+        config_manager.flush()
+        assert SecureConfigManager(config_dir=temp_dir).get("counter") == 99
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
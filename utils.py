@@ -3,49 +3,153 @@
 
 import os
 import json
-import requests
 import time
+import atexit
 import asyncio
-from typing import Optional, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
-from kivy.utils import platform
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, Dict, Any, List
 
-if platform == "android":
+from controller import metrics
+from controller.cache import MemoryLRU, ResponseCache
+from controller.cache_key import DEFAULT_NORMALIZE, CacheKeyBuilder
+from controller.resilience import Resilience
+from controller.secret_store import Keystore, SecretCipher, default_keystore
+from controller.singleflight import SingleFlight
+
+# requests, ThreadPoolExecutor und jnius werden erst bei Bedarf importiert,
+# damit `import utils` den Kaltstart nicht verlängert
+
+_MISSING = object()
+
+# Gleiche Erkennung wie kivy.utils.platform, ohne Kivy zu importieren
+IS_ANDROID = "ANDROID_ARGUMENT" in os.environ or "P4A_BOOTSTRAP" in os.environ
+
+
+@lru_cache(maxsize=1)
+def _python_activity():
+    """org.kivy.android.PythonActivity (nur auf Android, sonst None)"""
+    if not IS_ANDROID:
+        return None
     try:
         from jnius import autoclass
 
-        PythonActivity = autoclass("org.kivy.android.PythonActivity")
+        return autoclass("org.kivy.android.PythonActivity")
     except ImportError:
-        PythonActivity = None
-else:
-    PythonActivity = None
+        return None
 
 
 class AsyncNetworkHandler:
     """Asynchroner Network Handler für bessere Performance"""
 
-    def __init__(self):
-        self.session = requests.Session()
-        # User-Agent für Samsung S25
-        self.session.headers.update(
-            {"User-Agent": "aiDroid/2.0 (Samsung SM-S921B; Android 15; One UI 7)"}
-        )
+    def __init__(self, config: Optional["SecureConfigManager"] = None):
+        self._session = None
+        self._executor = None
 
         self.cache_dir = self._get_cache_dir()
         self.base_url = "https://api.openrouter.ai/api/v1"
         self.timeout = 30
 
-        # Async Thread Pool
-        self.executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="aiDroid")
+        # Cache-Grenzen: cache_max_age in Stunden, cache_max_size_mb in MB
+        max_age_hours = config.get("cache_max_age", 1) if config else 1
+        max_size_mb = config.get("cache_max_size_mb", 16) if config else 16
+        self.cache_max_age = max_age_hours * 3600
+        self.cache_max_bytes = int(max_size_mb * 1024 * 1024)
+        self._cache: Optional[ResponseCache] = None
+
+        # In-Memory LRU vor dem Festplatten-Cache
+        self.memory_cache = MemoryLRU(
+            max_entries=config.get("memory_cache_entries", 256) if config else 256,
+            max_bytes=2 * 1024 * 1024,
+            max_age=self.cache_max_age,
+        )
+        self.cache_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        # Schlüssel: Normalisierung (cache_normalize) und optional Ähnlichkeitssuche
+        # für fast gleiche Prompts ab cache_similarity_threshold (z.B. 0.9)
+        self.key_builder = CacheKeyBuilder(
+            normalize=config.get("cache_normalize", DEFAULT_NORMALIZE)
+            if config
+            else DEFAULT_NORMALIZE,
+            similarity_threshold=config.get("cache_similarity_threshold")
+            if config
+            else None,
+        )
+
+        # Gleichzeitige identische Anfragen teilen sich einen Aufruf
+        self.inflight = SingleFlight()
+
+        # Obergrenze gleichzeitiger Anfragen; das Warten darauf belegt keinen Thread
+        self.max_concurrent_requests = (
+            config.get("max_concurrent_requests", 64) if config else 64
+        )
+        # Ein Semaphore je Event-Loop: asyncio-Primitive gehören zu genau einem Loop
+        self._request_slots = weakref.WeakKeyDictionary()
+
+        # Retries, Drosselung (api_rate_limit Anfragen/s) und Circuit Breaker
+        self.resilience = Resilience(
+            rate=config.get("api_rate_limit") if config else None
+        )
 
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir, exist_ok=True)
 
+    @property
+    def request_slots(self) -> asyncio.Semaphore:
+        """Semaphore für max_concurrent_requests im laufenden Event-Loop"""
+        loop = asyncio.get_running_loop()
+        slots = self._request_slots.get(loop)
+        if slots is None:
+            slots = self._request_slots[loop] = asyncio.Semaphore(
+                self.max_concurrent_requests
+            )
+        return slots
+
+    @property
+    def session(self):
+        """requests-Session (requests wird beim ersten Zugriff importiert)"""
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+            # User-Agent für Samsung S25
+            self._session.headers.update(
+                {"User-Agent": "aiDroid/2.0 (Samsung SM-S921B; Android 15; One UI 7)"}
+            )
+        return self._session
+
+    @property
+    def executor(self):
+        """Thread Pool nur für blockierende Arbeit (Festplatten-Cache, sync API)"""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=3, thread_name_prefix="aiDroid"
+            )
+        return self._executor
+
+    @property
+    def cache(self) -> ResponseCache:
+        """Cache-Datenbank (wird beim ersten Zugriff geöffnet)"""
+        path = os.path.join(self.cache_dir, "responses.db")
+        if self._cache is None or self._cache.db_path != path:
+            if self._cache is not None:
+                self._cache.close()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._cache = ResponseCache(
+                path, max_bytes=self.cache_max_bytes, max_age=self.cache_max_age
+            )
+        return self._cache
+
     def _get_cache_dir(self) -> str:
         """Cache-Verzeichnis ermitteln"""
         try:
-            if platform == "android" and PythonActivity:
-                cache_dir = PythonActivity.mActivity.getCacheDir().getPath()
+            activity = _python_activity()
+            if activity:
+                cache_dir = activity.mActivity.getCacheDir().getPath()
                 app_cache = os.path.join(cache_dir, "aidroid")
                 return app_cache
             else:
@@ -53,33 +157,85 @@ class AsyncNetworkHandler:
         except Exception:
             return os.path.join(os.getcwd(), "cache")
 
-    async def process_request_async(self, message: str) -> str:
-        """Async Wrapper für process_request"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self.process_request, message)
+    async def process_request_async(
+        self,
+        message: str,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        context: Optional[List[Dict[str, str]]] = None,
+    ) -> str:
+        """Asynchrone Nachrichtenverarbeitung (identische laufende Anfragen werden zusammengelegt)"""
+        params = {"model": model, "temperature": temperature, "context": context}
+        return await self.inflight.run(
+            self._get_cache_key(message, **params),
+            lambda: self._process_request_async(message, params),
+        )
+
+    async def _process_request_async(self, message: str, params: Dict[str, Any]) -> str:
+        try:
+            async with self.request_slots:
+                with metrics.timer("request.latency"):
+                    cached = await self.get_cached_response_async(message, **params)
+                    if cached:
+                        return f"💾 {cached}"
+
+                    response = await self.make_api_request_async(message)
+                    await self.cache_response_async(message, response, **params)
+                    return response
+
+        except Exception as e:
+            metrics.inc("request.errors")
+            return f"❌ Fehler: {str(e)}"
 
-    def process_request(self, message: str) -> str:
+    async def _run_blocking(self, fn, *args):
+        """Blockierende Festplattenarbeit im Thread Pool ausführen"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def process_request(
+        self,
+        message: str,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        context: Optional[List[Dict[str, str]]] = None,
+    ) -> str:
         """Synchrone Nachrichtenverarbeitung mit Caching"""
+        params = {"model": model, "temperature": temperature, "context": context}
         try:
             # Cache-Check
-            cached = self.get_cached_response(message)
+            cached = self.get_cached_response(message, **params)
             if cached:
                 return f"💾 {cached}"
 
             # Neue Anfrage
             response = self.make_api_request(message)
-            self.cache_response(message, response)
+            self.cache_response(message, response, **params)
             return response
 
         except Exception as e:
+            metrics.inc("request.errors")
             return f"❌ Fehler: {str(e)}"
 
     def make_api_request(self, message: str) -> str:
         """API-Anfrage simulieren oder echte API aufrufen"""
-        try:
-            # Kurze Simulation für Demo
-            time.sleep(0.5)
+        return self.resilience.call_sync(self._request, message)
+
+    async def make_api_request_async(self, message: str) -> str:
+        """Wie make_api_request, wartet aber ohne einen Thread zu belegen"""
+        return await self.resilience.call(self._request_async, message)
 
+    def _request(self, message: str) -> str:
+        # Kurze Simulation für Demo
+        time.sleep(0.5)
+        return self._answer(message)
+
+    async def _request_async(self, message: str) -> str:
+        await asyncio.sleep(0.5)
+        return self._answer(message)
+
+    def _answer(self, message: str) -> str:
+        """Antwort der Demo-API"""
+        try:
             msg_lower = message.lower()
 
             # Samsung S25 spezifische Antworten
@@ -112,50 +268,96 @@ class AsyncNetworkHandler:
         except Exception as e:
             return f"🚫 API-Anfrage fehlgeschlagen: {str(e)}"
 
-    def get_cached_response(self, message: str) -> Optional[str]:
-        """Cache-Response abrufen"""
+    def get_cached_response(self, message: str, **params) -> Optional[str]:
+        """Cache-Response abrufen (params: model, temperature, context)"""
         try:
-            fname = self._get_cache_filename(message)
-            if os.path.exists(fname):
-                with open(fname, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                # Cache-Validität: 1 Stunde
-                if time.time() - data.get("timestamp", 0) < 3600:
-                    return data.get("response")
-
+            keys = self.key_builder.candidates(message, **params)
+            cached = self._memory_lookup(keys)
+            if cached is not None:
+                return cached
+            cached = self._disk_lookup(keys)
+            if cached is not None:
+                return cached
         except Exception:
             pass
+        self._record_miss()
         return None
 
-    def cache_response(self, message: str, response: str) -> None:
-        """Response cachen"""
+    async def get_cached_response_async(self, message: str, **params) -> Optional[str]:
+        """Cache-Response abrufen; nur der Festplatten-Cache läuft im Thread Pool"""
         try:
-            fname = self._get_cache_filename(message)
-            data = {
-                "message": message,
-                "response": response,
-                "timestamp": time.time(),
-                "device": "samsung_s25" if "s25" in message.lower() else "generic",
-            }
+            keys = self.key_builder.candidates(message, **params)
+            cached = self._memory_lookup(keys)
+            if cached is not None:
+                return cached
+            cached = await self._run_blocking(self._disk_lookup, keys)
+            if cached is not None:
+                return cached
+        except Exception:
+            pass
+        self._record_miss()
+        return None
 
-            with open(fname, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def _memory_lookup(self, keys: List[str]) -> Optional[str]:
+        for index, key in enumerate(keys):
+            cached = self.memory_cache.get(key)
+            if cached is not None:
+                self.cache_stats["memory_hits"] += 1
+                metrics.inc("cache.memory_hits")
+                self.key_builder.record(index)
+                return cached
+        return None
+
+    def _disk_lookup(self, keys: List[str]) -> Optional[str]:
+        for index, key in enumerate(keys):
+            entry = self.cache.get_entry(key)
+            if entry is not None:
+                self.cache_stats["disk_hits"] += 1
+                metrics.inc("cache.disk_hits")
+                self.key_builder.record(index)
+                self.memory_cache.put(key, entry[0], created=entry[1])
+                return entry[0]
+        return None
+
+    def _record_miss(self) -> None:
+        self.cache_stats["misses"] += 1
+        metrics.inc("cache.misses")
+        self.key_builder.record(None)
 
+    async def cache_response_async(self, message: str, response: str, **params) -> None:
+        """Response cachen, ohne die Event-Loop zu blockieren"""
+        key = self._get_cache_key(message, **params)
+        device = "samsung_s25" if "s25" in message.lower() else "generic"
+        self.memory_cache.put(key, response)
+        try:
+            await self._run_blocking(self.cache.put, key, response, device)
+            self.key_builder.remember(message, key, **params)
         except Exception as e:
             print(f"Cache error: {e}")
 
-    def _get_cache_filename(self, message: str) -> str:
-        """Cache-Dateiname generieren"""
-        import hashlib
+    def cache_response(self, message: str, response: str, **params) -> None:
+        """Response cachen"""
+        try:
+            key = self._get_cache_key(message, **params)
+            device = "samsung_s25" if "s25" in message.lower() else "generic"
+            self.memory_cache.put(key, response)
+            self.cache.put(key, response, device=device)
+            self.key_builder.remember(message, key, **params)
+        except Exception as e:
+            print(f"Cache error: {e}")
 
-        md5hash = hashlib.md5(message.encode("utf-8")).hexdigest()
-        return os.path.join(self.cache_dir, f"cache_{md5hash}.json")
+    def _get_cache_key(self, message: str, **params) -> str:
+        """Cache-Schlüssel aus Modell, Temperatur, Kontext und normalisierter Nachricht"""
+        return self.key_builder.build(message, **params)
 
     def clear_cache(self) -> int:
         """Cache leeren"""
         deleted = 0
         try:
+            self.memory_cache.clear()
+            self.key_builder.clear()
+            deleted = self.cache.clear()
+            # Alte Einzeldatei-Einträge (cache_<md5>.json) mit entfernen
             if os.path.exists(self.cache_dir):
                 for fn in os.listdir(self.cache_dir):
                     if fn.startswith("cache_") and fn.endswith(".json"):
@@ -168,28 +370,21 @@ class AsyncNetworkHandler:
     def get_cache_info(self) -> Dict[str, Any]:
         """Cache-Informationen"""
         try:
-            if not os.path.exists(self.cache_dir):
-                return {
-                    "cache_dir": self.cache_dir,
-                    "file_count": 0,
-                    "total_size": 0,
-                    "size_mb": 0,
-                }
-
-            count = 0
-            size = 0
-
-            for fn in os.listdir(self.cache_dir):
-                if fn.startswith("cache_") and fn.endswith(".json"):
-                    path = os.path.join(self.cache_dir, fn)
-                    count += 1
-                    size += os.path.getsize(path)
-
+            info = self.cache.info()
+            size = info["total_size"]
             return {
                 "cache_dir": self.cache_dir,
-                "file_count": count,
+                "file_count": info["entries"],
                 "total_size": size,
                 "size_mb": round(size / (1024 * 1024), 2),
+                "max_size_mb": round(info["max_size"] / (1024 * 1024), 2),
+                "max_age": info["max_age"],
+                "memory_entries": len(self.memory_cache),
+                "memory_size": self.memory_cache.total_bytes,
+                **self.cache_stats,
+                **self.key_builder.report(),
+                "coalesced": self.inflight.coalesced,
+                "inflight": len(self.inflight),
             }
 
         except Exception:
@@ -197,11 +392,44 @@ class AsyncNetworkHandler:
 
 
 class SecureConfigManager:
-    """Sichere Konfigurationsverwaltung mit Verschlüsselung"""
-
-    def __init__(self):
-        self.config_dir = self._get_config_dir()
+    """
+    Sichere Konfigurationsverwaltung mit Verschlüsselung.
+
+    Änderungen werden atomar geschrieben (Temp-Datei + rename), mehrere
+    Änderungen in `batch()`/`update()` mit nur einem Schreibvorgang. Mit
+    `write_delay` > 0 wird verzögert im Hintergrund geschrieben (flush()
+    erzwingt es). Listener (`add_listener`) erfahren Änderungen direkt,
+    ohne die Datei neu zu lesen.
+
+    API-Keys und Tokens liegen verschlüsselt im Abschnitt "secrets"
+    (`get_secret`/`set_secret`); der Schlüssel kommt aus `keystore`
+    (Standard: Android Keystore bzw. Schlüsselbund, nur ohne diese eine
+    Datei im Konfigurationsverzeichnis) und wird erst beim ersten
+    Secret-Zugriff abgeleitet. get() bleibt ein Dict-Zugriff.
+    """
+
+    def __init__(
+        self,
+        config_dir: Optional[str] = None,
+        write_delay: float = 0.0,
+        keystore: Optional[Keystore] = None,
+    ):
+        self.config_dir = config_dir or self._get_config_dir()
         self.config_file = os.path.join(self.config_dir, "config.json")
+        self.write_delay = write_delay
+        self._keystore = keystore
+        self._secret_cipher: Optional[SecretCipher] = None
+        self._secret_values: Dict[str, str] = {}
+
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._batch_changes: Dict[str, Any] = {}
+        self._batch_undo: Dict[str, Any] = {}
+        self._listeners: List[Any] = []
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        if write_delay > 0:
+            atexit.register(self.flush)
 
         if not os.path.exists(self.config_dir):
             os.makedirs(self.config_dir, exist_ok=True)
@@ -211,8 +439,9 @@ class SecureConfigManager:
     def _get_config_dir(self) -> str:
         """Konfigurationsverzeichnis ermitteln"""
         try:
-            if platform == "android" and PythonActivity:
-                files_dir = PythonActivity.mActivity.getFilesDir().getPath()
+            activity = _python_activity()
+            if activity:
+                files_dir = activity.mActivity.getFilesDir().getPath()
                 return os.path.join(files_dir, "config")
             else:
                 return os.path.join(os.getcwd(), "config")
@@ -247,32 +476,170 @@ class SecureConfigManager:
             return {}
 
     def save_config(self, config: Optional[Dict[str, Any]] = None) -> None:
-        """Konfiguration speichern"""
+        """Konfiguration atomar speichern (nie halb geschriebene Datei)"""
         try:
-            if config is None:
-                config = self.config
-
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                if config is None:
+                    config = self.config
+                data = json.dumps(config, ensure_ascii=False, indent=2)
+                self._dirty = False
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+                tmp = self.config_file + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.config_file)
 
         except Exception as e:
             print(f"Config save error: {e}")
 
+    def flush(self) -> None:
+        """Verzögerte Änderungen sofort schreiben"""
+        with self._lock:
+            if self._dirty:
+                self.save_config()
+
     def get(self, key: str, default: Any = None) -> Any:
         """Wert abrufen"""
         return self.config.get(key, default)
 
     def set(self, key: str, value: Any) -> None:
         """Wert setzen"""
+        self.update({key: value})
+
+    def update(self, values: Dict[str, Any]) -> None:
+        """Mehrere Werte setzen, ein Schreibvorgang"""
+        with self.batch():
+            for key, value in values.items():
+                self._stage(key, value)
+
+    @contextmanager
+    def batch(self):
+        """
+        Sammelt alle set()-Aufrufe im Block und schreibt am Ende einmal.
+        Bei einer Exception im Block werden die Änderungen zurückgenommen.
+        """
+        self._lock.acquire()
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._batch_depth == 1:
+                self._rollback()
+            raise
+        finally:
+            self._batch_depth -= 1
+            changes: Dict[str, Any] = {}
+            if self._batch_depth == 0:
+                changes, self._batch_changes = self._batch_changes, {}
+                self._batch_undo = {}
+            self._lock.release()
+        if changes:
+            self._changed(changes)
+
+    def _stage(self, key: str, value: Any) -> None:
+        old = self.config.get(key, _MISSING)
+        # Dicts/Listen können in-place geändert worden sein: dann ist
+        # old dasselbe Objekt wie value, aber trotzdem noch nicht gespeichert
+        mutated = old is value and isinstance(value, (dict, list))
+        if old is not _MISSING and old == value and not mutated:
+            return
+        self._batch_undo.setdefault(key, old)
         self.config[key] = value
-        self.save_config()
+        self._batch_changes[key] = value
+
+    def _rollback(self) -> None:
+        for key, old in self._batch_undo.items():
+            if old is _MISSING:
+                self.config.pop(key, None)
+            else:
+                self.config[key] = old
+        self._batch_changes = {}
+        self._batch_undo = {}
+
+    def _changed(self, changes: Dict[str, Any]) -> None:
+        with self._lock:
+            self._dirty = True
+            if self.write_delay <= 0:
+                self.save_config()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        for callback, keys in list(self._listeners):
+            relevant = (
+                changes
+                if keys is None
+                else {k: v for k, v in changes.items() if k in keys}
+            )
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    print(f"Config listener error: {e}")
+
+    def add_listener(self, callback, keys: Optional[List[str]] = None) -> None:
+        """callback({key: neuer_wert}) nach jeder Änderung (optional nur für `keys`)"""
+        self._listeners.append((callback, set(keys) if keys is not None else None))
+
+    def remove_listener(self, callback) -> None:
+        self._listeners = [
+            (cb, keys) for cb, keys in self._listeners if cb is not callback
+        ]
+
+    @property
+    def keystore(self) -> Keystore:
+        """Plattform-Keystore (Android Keystore, Schlüsselbund), sonst Schlüsseldatei"""
+        if self._keystore is None:
+            self._keystore = default_keystore(self.config_dir, android=IS_ANDROID)
+        return self._keystore
+
+    def _cipher(self) -> SecretCipher:
+        if self._secret_cipher is None:
+            section = self.config.get("secrets") or {}
+            self._secret_cipher = SecretCipher(self.keystore, section.get("salt"))
+        return self._secret_cipher
+
+    def get_secret(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Secret entschlüsseln (nur beim ersten Zugriff, danach aus dem Speicher)"""
+        value = self._secret_values.get(name)
+        if value is not None:
+            return value
+        token = (self.config.get("secrets") or {}).get("values", {}).get(name)
+        if token is None:
+            return default
+        value = self._cipher().decrypt(token)
+        self._secret_values[name] = value
+        return value
+
+    def set_secret(self, name: str, value: Optional[str]) -> None:
+        """Secret verschlüsselt speichern; None löscht es"""
+        cipher = self._cipher()
+        section = dict(self.config.get("secrets") or {})
+        values = dict(section.get("values", {}))
+        if value is None:
+            values.pop(name, None)
+            self._secret_values.pop(name, None)
+        else:
+            values[name] = cipher.encrypt(value)
+            self._secret_values[name] = value
+        section.update(salt=cipher.salt, values=values)
+        self.set("secrets", section)
 
     def optimize_for_s25(self) -> None:
         """S25-spezifische Optimierungen"""
-        self.set("device_optimization", "samsung_s25")
-        self.set("performance_mode", "high")
-        self.set("display_refresh_rate", 120)
-        self.set("memory_optimization", True)
+        self.update(
+            {
+                "device_optimization": "samsung_s25",
+                "performance_mode": "high",
+                "display_refresh_rate": 120,
+                "memory_optimization": True,
+            }
+        )
 
 
 if __name__ == "__main__":